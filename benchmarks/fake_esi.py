@@ -0,0 +1,366 @@
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from email.utils import formatdate
+from hashlib import md5
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from jwcrypto.jwk import JWK, JWKSet
+from jwcrypto.jwt import JWT
+
+
+@dataclass
+class FakeServerConfig:
+    """Knobs for the fake ESI/SSO server"""
+
+    latency: float = 0.0
+    pages: int = 5
+    page_size: int = 1000
+    cache_seconds: int = 300
+    error_limit_remain: int = 100
+    error_limit_reset: int = 60
+    client_id: str = "benchmark-client"
+    scopes: List[str] = field(
+        default_factory=lambda: ["esi-wallet.read_character_wallet.v1", "esi-universe.read_structures.v1"]
+    )
+    # Structure IDs divisible by this return 403 Forbidden
+    structure_forbidden_every: int = 2
+
+
+class FakeEveServer:
+    """
+    Local stand-in for esi.evetech.net and login.eveonline.com.
+
+    Serves paginated and ETag aware ESI routes plus an SSO token endpoint that signs JWTs with a
+    locally generated key published through a JWKS endpoint.  Both hosts share one port, so
+    DJANGO_ESI_AUTH_ESI_URL and DJANGO_ESI_AUTH_SSO_URL can both point at base_url.
+    """
+
+    def __init__(self, config: FakeServerConfig = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or FakeServerConfig()
+        self.key = JWK.generate(kty="RSA", size=2048, kid="benchmark", alg="RS256")
+        self.requests_served = 0
+        self._lock = threading.Lock()
+        self._payloads: Dict[Tuple[str, int], Tuple[bytes, str]] = {}
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeEveServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeEveServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def jwks(self) -> str:
+        jwks = JWKSet()
+        jwks.add(self.key)
+        return jwks.export(private_keys=False)
+
+    def issue_token(self, character_id: int, character_name: str = None, owner: str = None) -> Dict[str, Any]:
+        """
+        Returns:
+            Token endpoint response with a signed access token for the character
+        """
+        now = int(time.time())
+        claims = {
+            "scp": self.config.scopes,
+            "jti": md5(f"{character_id}{time.monotonic_ns()}".encode()).hexdigest(),
+            "kid": "benchmark",
+            "sub": f"CHARACTER:EVE:{character_id}",
+            "azp": self.config.client_id,
+            "tenant": "tranquility",
+            "tier": "live",
+            "region": "world",
+            "aud": [self.config.client_id, "EVE Online"],
+            "name": character_name or f"Bench Character{character_id}",
+            "owner": owner or md5(str(character_id).encode()).hexdigest(),
+            "exp": now + 1200,
+            "iat": now,
+            "iss": "https://login.eveonline.com",
+        }
+        jwt = JWT(header={"alg": "RS256", "kid": "benchmark", "typ": "JWT"}, claims=claims)
+        jwt.make_signed_token(self.key)
+        return {
+            "access_token": jwt.serialize(),
+            "expires_in": 1199,
+            "token_type": "Bearer",
+            "refresh_token": f"refresh-{character_id}",
+        }
+
+    def _paged_payload(self, path: str, page: int, builder) -> Tuple[bytes, str]:
+        key = (path, page)
+        payload = self._payloads.get(key)
+        if payload is None:
+            body = json.dumps(builder(page)).encode()
+            payload = self._payloads[key] = (body, md5(body).hexdigest())
+        return payload
+
+    def _journal_rows(self, character_id: int, page: int) -> List[Dict[str, Any]]:
+        size = self.config.page_size
+        top = self.config.pages * size
+        return [
+            {
+                "id": top - i,
+                "date": "2025-07-29T19:25:00Z",
+                "ref_type": "player_donation",
+                "amount": 1000000.0,
+                "balance": 25000000.0,
+                "description": "Bench donation",
+                "first_party_id": character_id,
+                "second_party_id": 90000001,
+                "reason": "",
+            }
+            for i in range((page - 1) * size, page * size)
+        ]
+
+    def _transaction_rows(self, character_id: int, from_id: int | None) -> List[Dict[str, Any]]:
+        # Not paginated like ESI, one batch of page_size rows at or below from_id
+        size = self.config.page_size
+        top = self.config.pages * size if from_id is None else min(from_id, self.config.pages * size)
+        return [
+            {
+                "transaction_id": top - i,
+                "date": "2025-07-29T19:25:00Z",
+                "type_id": 34,
+                "quantity": 1000,
+                "unit_price": 5.5,
+                "client_id": 90000001,
+                "location_id": 60003760,
+                "is_buy": bool(i % 2),
+                "is_personal": True,
+                "journal_ref_id": top - i,
+            }
+            for i in range(min(size, top))
+        ]
+
+    def _contract_rows(self, owner_id: int, page: int) -> List[Dict[str, Any]]:
+        return [
+            {
+                "contract_id": (page - 1) * 100 + i + 1,
+                "issuer_id": owner_id,
+                "issuer_corporation_id": 98000001,
+                "assignee_id": 0,
+                "acceptor_id": 0,
+                "type": "item_exchange",
+                "status": "outstanding",
+                "availability": "public",
+                "for_corporation": False,
+                "date_issued": "2025-07-29T19:25:00Z",
+                "date_expired": "2025-08-12T19:25:00Z",
+                "price": 1000000.0,
+                "volume": 10.0,
+            }
+            for i in range(100)
+        ]
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def _dispatch(self, method: str):
+                with server._lock:
+                    server.requests_served += 1
+                if server.config.latency:
+                    time.sleep(server.config.latency)
+
+                url = urlsplit(self.path)
+                query = parse_qs(url.query)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+
+                for route_method, pattern, handler in ROUTES:
+                    if route_method == method:
+                        match = pattern.fullmatch(url.path)
+                        if match:
+                            return handler(self, match, query, body)
+
+                self._send(404, {"error": "Not found"})
+
+            def _send(self, status: int, payload, headers: Dict[str, str] = None, raw: bytes = None):
+                body = raw if raw is not None else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body) if status != 304 else 0))
+                self.send_header("x-esi-error-limit-remain", str(server.config.error_limit_remain))
+                self.send_header("x-esi-error-limit-reset", str(server.config.error_limit_reset))
+                self.send_header("Expires", formatdate(time.time() + server.config.cache_seconds, usegmt=True))
+                self.send_header("Last-Modified", formatdate(time.time() - 60, usegmt=True))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                if status != 304:
+                    self.wfile.write(body)
+
+            def _send_paged(self, path: str, query, builder, pages: int):
+                page = int(query.get("page", ["1"])[0])
+                if page > pages:
+                    return self._send(404, {"error": "Requested page does not exist!"})
+                body, etag = server._paged_payload(path, page, builder)
+                headers = {"ETag": f'"{etag}"', "x-pages": str(pages)}
+                if self.headers.get("If-None-Match", "").strip('"') == etag:
+                    return self._send(304, None, headers, b"")
+                self._send(200, None, headers, body)
+
+            def sso_metadata(self, match, query, body):
+                self._send(200, {"issuer": server.base_url, "jwks_uri": f"{server.base_url}/oauth/jwks"})
+
+            def sso_jwks(self, match, query, body):
+                self._send(200, None, raw=server.jwks().encode())
+
+            def sso_token(self, match, query, body):
+                form = parse_qs(body.decode())
+                if form.get("grant_type", [""])[0] == "refresh_token":
+                    if form["refresh_token"][0].startswith("revoked"):
+                        return self._send(400, {"error": "invalid_grant", "error_description": "Invalid refresh token"})
+                    character_id = int(form["refresh_token"][0].split("-")[-1])
+                else:
+                    character_id = int(form.get("code", ["90000001"])[0])
+                self._send(200, server.issue_token(character_id))
+
+            def character(self, match, query, body):
+                character_id = int(match["id"])
+                self._send(
+                    200,
+                    {
+                        "name": f"Bench Character{character_id}",
+                        "corporation_id": 98000001,
+                        "alliance_id": 99000001,
+                        "birthday": "2015-03-24T11:37:00Z",
+                        "gender": "female",
+                        "race_id": 2,
+                        "bloodline_id": 3,
+                        "security_status": 0.0,
+                    },
+                )
+
+            def corporation(self, match, query, body):
+                corporation_id = int(match["id"])
+                self._send(
+                    200,
+                    {
+                        "name": f"Bench Corporation {corporation_id}",
+                        "ticker": "BENCH",
+                        "member_count": 100,
+                        "ceo_id": 90000001,
+                        "creator_id": 90000001,
+                        "alliance_id": 99000001,
+                        "tax_rate": 0.1,
+                    },
+                )
+
+            def alliance(self, match, query, body):
+                alliance_id = int(match["id"])
+                self._send(
+                    200,
+                    {
+                        "name": f"Bench Alliance {alliance_id}",
+                        "ticker": "BNCH",
+                        "creator_id": 90000001,
+                        "creator_corporation_id": 98000001,
+                        "date_founded": "2015-03-24T11:37:00Z",
+                    },
+                )
+
+            def journal(self, match, query, body):
+                character_id = int(match["id"])
+                self._send_paged(
+                    match.group(0), query, lambda page: server._journal_rows(character_id, page), server.config.pages
+                )
+
+            def transactions(self, match, query, body):
+                character_id = int(match["id"])
+                from_id = int(query["from_id"][0]) if "from_id" in query else None
+                self._send_paged(
+                    f"{match.group(0)}?from_id={from_id}",
+                    query,
+                    lambda page: server._transaction_rows(character_id, from_id),
+                    1,
+                )
+
+            def contracts(self, match, query, body):
+                owner_id = int(match["id"])
+                self._send_paged(
+                    match.group(0), query, lambda page: server._contract_rows(owner_id, page), server.config.pages
+                )
+
+            def contract_items(self, match, query, body):
+                contract_id = int(match["contract_id"])
+                self._send(
+                    200,
+                    [
+                        {"record_id": contract_id * 10 + i, "type_id": 34, "quantity": 100, "is_included": True}
+                        for i in range(5)
+                    ],
+                )
+
+            def structure(self, match, query, body):
+                structure_id = int(match["id"])
+                if structure_id % server.config.structure_forbidden_every == 0:
+                    return self._send(403, {"error": "Forbidden"})
+                self._send(
+                    200,
+                    {
+                        "name": f"Bench Structure {structure_id}",
+                        "owner_id": 98000001,
+                        "solar_system_id": 30000142,
+                        "type_id": 35832,
+                    },
+                )
+
+            def names(self, match, query, body):
+                ids = json.loads(body or b"[]")
+                if any(i < 100 for i in ids):
+                    # Like ESI, one invalid ID fails the whole call
+                    return self._send(404, {"error": "Ensure all IDs are valid before resolving."})
+                self._send(200, [{"id": i, "name": f"Entity {i}", "category": "character"} for i in ids])
+
+        ROUTES = [
+            ("GET", re.compile(r"/\.well-known/oauth-authorization-server"), Handler.sso_metadata),
+            ("GET", re.compile(r"/oauth/jwks"), Handler.sso_jwks),
+            ("POST", re.compile(r"/v2/oauth/token"), Handler.sso_token),
+            ("GET", re.compile(r"(?:/latest)?/characters/(?P<id>\d+)/"), Handler.character),
+            ("GET", re.compile(r"/corporations/(?P<id>\d+)/"), Handler.corporation),
+            ("GET", re.compile(r"/alliances/(?P<id>\d+)/"), Handler.alliance),
+            ("GET", re.compile(r"/characters/(?P<id>\d+)/wallet/journal/"), Handler.journal),
+            ("GET", re.compile(r"/characters/(?P<id>\d+)/wallet/transactions/"), Handler.transactions),
+            ("GET", re.compile(r"/(?:characters|corporations)/(?P<id>\d+)/contracts/"), Handler.contracts),
+            (
+                "GET",
+                re.compile(r"/(?:characters|corporations)/(?P<id>\d+)/contracts/(?P<contract_id>\d+)/items/?"),
+                Handler.contract_items,
+            ),
+            ("GET", re.compile(r"/universe/structures/(?P<id>\d+)/"), Handler.structure),
+            ("POST", re.compile(r"/universe/names/"), Handler.names),
+        ]
+
+        return Handler
@@ -0,0 +1,266 @@
+"""
+Benchmarks for the main django_esi_auth flows against a local fake ESI/SSO server.
+
+    python -m benchmarks.run [--iterations 50] [--latency 0.005] [--output results.json]
+    python -m benchmarks.run --record esi.cassette
+    python -m benchmarks.run --replay esi.cassette [--replay-latency recorded]
+    python -m benchmarks.run --compare benchmarks/results/<base>.json benchmarks/results/<head>.json
+
+With --replay every ESIClient request is answered from the cassette instead of the fake server, SSO
+calls still go to the fake server.
+
+Results are written to benchmarks/results/<commit>.json unless --output is given.
+"""
+
+import argparse
+import contextlib
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from statistics import median
+from time import perf_counter
+from typing import Any, Callable, Dict, List
+
+from .fake_esi import FakeEveServer, FakeServerConfig
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def configure_django(server: FakeEveServer):
+    import django
+    from django.conf import settings
+
+    settings.configure(
+        SECRET_KEY="benchmark-secret-key-benchmark-secret-key-benchmark",
+        INSTALLED_APPS=[
+            "django.contrib.auth",
+            "django.contrib.contenttypes",
+            "django.contrib.sessions",
+            "django.contrib.messages",
+            "django_esi_auth",
+        ],
+        DATABASES={"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}},
+        AUTH_USER_MODEL="django_esi_auth.EveUser",
+        USE_TZ=True,
+        SITE_DOMAIN="localhost",
+        ESI_SSO_CLIENT_ID=server.config.client_id,
+        ESI_SSO_CLIENT_SECRET="benchmark",
+        DJANGO_ESI_AUTH_DEFAULT_GROUP=None,
+        DJANGO_ESI_AUTH_ESI_URL=server.base_url,
+        DJANGO_ESI_AUTH_SSO_URL=server.base_url,
+    )
+    django.setup()
+
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(name: str, operation: Callable[[int], Any], iterations: int, warmup: int = 2) -> Dict[str, Any]:
+    """
+    Run operation repeatedly and collect wall time and query counts per call
+
+    Args:
+        name: Scenario name, used for progress output
+        operation: Callable taking the iteration number
+        iterations: Number of measured calls
+        warmup: Number of unmeasured calls made first
+
+    Returns:
+        Summary of the measured calls
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    for i in range(warmup):
+        operation(-i - 1)
+
+    latencies = []
+    queries = []
+    started = perf_counter()
+    for i in range(iterations):
+        with CaptureQueriesContext(connection) as ctx:
+            op_started = perf_counter()
+            operation(i)
+            latencies.append(perf_counter() - op_started)
+        queries.append(len(ctx.captured_queries))
+    total = perf_counter() - started
+
+    result = {
+        "iterations": iterations,
+        "ops_per_sec": iterations / total if total else 0.0,
+        "p50_ms": median(latencies) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "queries_per_op": sum(queries) / len(queries),
+    }
+    print(
+        f"{name:<28} {result['ops_per_sec']:>9.1f} ops/s  p50 {result['p50_ms']:>8.2f} ms  "
+        f"p99 {result['p99_ms']:>8.2f} ms  {result['queries_per_op']:>6.1f} queries/op"
+    )
+    return result
+
+
+def build_scenarios() -> Dict[str, Callable[[int], Any]]:
+    from django_esi_auth.auth import EveAuthenticationBackend
+    from django_esi_auth.choices import EveEntityTypeEnum
+    from django_esi_auth.client import ESIClient
+    from django_esi_auth.models import EveEntity, LoginAccessRight, Token, TokenManager
+    from django_esi_auth.public_info import public_info
+
+    character_id = 90000001
+    Token.objects.save_sso_response(TokenManager.request_access_token_from_auth_code(str(character_id)))
+    token = Token.objects.get(character_id=character_id)
+
+    entity = EveEntity.objects.create(
+        eve_entity_id=98000001, eve_entity_type=EveEntityTypeEnum.CORPORATION, eve_entity_name="Bench Corp"
+    )
+    LoginAccessRight.objects.create(entity=entity)
+
+    client = ESIClient(token)
+    public_client = ESIClient()
+    first_page = client.get_character_journal(character_id)
+
+    def journal_all_pages(i):
+        response = client.get_character_journal(character_id)
+        while response.next_page:
+            response = client.get_page(response.next_page)
+
+    def journal_etag_304(i):
+        client.get_character_journal(character_id, etag=first_page.etag)
+
+    def token_refresh(i):
+        token.refresh()
+
+    def sso_login(i):
+        token_response = TokenManager.request_access_token_from_auth_code(str(character_id + 1 + max(i, 0) % 50))
+        EveAuthenticationBackend().authenticate(None, token_response=token_response)
+        Token.objects.save_sso_response(token_response)
+
+    def authenticate_stale_access_check(i):
+        from django_esi_auth.models import EveUser
+
+        EveUser.objects.filter(character_id=character_id).update(last_access_check=None)
+        token_response = TokenManager.request_access_token_from_auth_code(str(character_id))
+        EveAuthenticationBackend().authenticate(None, token_response=token_response)
+
+    unknown_ids = list(range(91000000, 91000500))
+    structure_ids = list(range(1030000000001, 1030000000021))
+
+    def update_unknowns(i):
+        EveEntity.objects.filter(eve_entity_id__in=unknown_ids + structure_ids).delete()
+        EveEntity.objects.bulk_create(
+            [EveEntity(eve_entity_id=e, eve_entity_type=EveEntityTypeEnum.CHARACTER) for e in unknown_ids]
+            + [EveEntity(eve_entity_id=s, eve_entity_type=EveEntityTypeEnum.STRUCTURE) for s in structure_ids]
+        )
+        EveEntity.objects.update_unknowns([token])
+
+    corporation_ids = list(range(98000001, 98000101))
+
+    def public_info_cached(i):
+        public_info.get_many("corporation", corporation_ids)
+
+    return {
+        "esi_public_character": lambda i: public_client.get_public_character_data(character_id),
+        "esi_journal_all_pages": journal_all_pages,
+        "esi_journal_etag_304": journal_etag_304,
+        "token_refresh": token_refresh,
+        "sso_login": sso_login,
+        "authenticate_access_check": authenticate_stale_access_check,
+        "update_unknowns": update_unknowns,
+        "public_info_cached": public_info_cached,
+    }
+
+
+def cassette_from_args(args: argparse.Namespace):
+    if not (args.record or args.replay):
+        return contextlib.nullcontext()
+
+    from django_esi_auth.cassette import Cassette
+
+    if args.record:
+        return Cassette(args.record, mode="record")
+    latency = args.replay_latency if args.replay_latency == "recorded" else float(args.replay_latency)
+    return Cassette(args.replay, latency=latency)
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(base_path: str, head_path: str):
+    base = json.loads(Path(base_path).read_text())
+    head = json.loads(Path(head_path).read_text())
+    print(f"{'scenario':<28} {'metric':<16} {base['commit']:>12} {head['commit']:>12} {'change':>9}")
+    for name, head_result in head["results"].items():
+        base_result = base["results"].get(name)
+        if not base_result:
+            continue
+        for metric in ("ops_per_sec", "p50_ms", "p99_ms", "queries_per_op"):
+            before, after = base_result[metric], head_result[metric]
+            change = f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+            print(f"{name:<28} {metric:<16} {before:>12.2f} {after:>12.2f} {change:>9}")
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every fake server response")
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--only", nargs="*", help="Scenario names to run")
+    parser.add_argument("--output", help="Results file, defaults to benchmarks/results/<commit>.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "HEAD"), help="Compare two results files")
+    parser.add_argument("--record", metavar="CASSETTE", help="Record ESI traffic to a cassette file")
+    parser.add_argument("--replay", metavar="CASSETTE", help="Answer ESI requests from a cassette file")
+    parser.add_argument("--replay-latency", default="0", help='Seconds added to every replayed response, or "recorded"')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    config = FakeServerConfig(latency=args.latency, pages=args.pages, page_size=args.page_size)
+    with FakeEveServer(config) as server:
+        configure_django(server)
+        with cassette_from_args(args):
+            scenarios = build_scenarios()
+
+            results = {}
+            for name, operation in scenarios.items():
+                if args.only and name not in args.only:
+                    continue
+                results[name] = measure(name, operation, args.iterations)
+
+    commit = current_commit()
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps(
+            {
+                "commit": commit,
+                "created": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "config": {**vars(config), "record": args.record, "replay": args.replay},
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+    print(f"Results written to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,154 @@
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ChangeList
 from django.contrib.auth.admin import UserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.text import smart_split, unescape_string_literal
 
 from .models import EveEntity, LoginAccessRight, EveUser, Token
+from .structures import STRUCTURE_SCOPE
+
+
+def estimated_count(queryset) -> int | None:
+    """
+    Row estimate from the database statistics, for unfiltered querysets on PostgreSQL and MySQL
+
+    Args:
+        queryset: Changelist queryset
+
+    Returns:
+        Estimated row count, None if there is no usable estimate
+    """
+    if queryset.query.has_filters() or queryset.query.distinct:
+        return None
+
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    if connection.vendor == "postgresql":
+        sql = "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass"
+    elif connection.vendor == "mysql":
+        sql = "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s"
+    else:
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [table])
+        row = cursor.fetchone()
+
+    # PostgreSQL reports -1 until the table has been analyzed
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses the database's row estimate instead of COUNT(*) for unfiltered changelists of big tables.
+
+    Filtered changelists and tables below DJANGO_ESI_AUTH_ADMIN_ESTIMATE_THRESHOLD rows are counted exactly.
+    """
+
+    @cached_property
+    def count(self) -> int:
+        estimate = estimated_count(self.object_list)
+        if estimate is not None and estimate >= getattr(settings, "DJANGO_ESI_AUTH_ADMIN_ESTIMATE_THRESHOLD", 100000):
+            return estimate
+        return super().count
+
+
+class ListOnlyChangeList(ChangeList):
+    def get_queryset(self, request, *args, **kwargs):
+        queryset = super().get_queryset(request, *args, **kwargs)
+        return queryset.only(*self.model_admin.list_only)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist settings for tables that grow to millions of rows.
+
+    Counts are estimated, the filtered count isn't repeated against the whole table and, when list_only
+    is set, the changelist only loads the columns it shows.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_only = None
+
+    def get_changelist(self, request, **kwargs):
+        if self.list_only:
+            return ListOnlyChangeList
+        return super().get_changelist(request, **kwargs)
+
+
+class IndexedSearchMixin:
+    """
+    Admin search that the column indexes can serve.
+
+    Numeric terms match search_id_fields exactly, which the integer indexes serve, and every term matches
+    search_prefix_fields case-insensitively from the start (istartswith).  PostgreSQL runs that as
+    UPPER(column::text) LIKE 'TERM%', served by the UPPER(column) text_pattern_ops indexes added in
+    migration 0013.  Plain search_fields, such as UserAdmin's, are still matched with icontains.  Quote a
+    term to search for a phrase, e.g. "jita iv".
+    """
+
+    search_id_fields = []
+    search_prefix_fields = []
+
+    def get_search_fields(self, request):
+        return [*self.search_id_fields, *self.search_prefix_fields, *super().get_search_fields(request)]
+
+    def get_search_results(self, request, queryset, search_term):
+        contains_fields = super().get_search_fields(request)
+        for term in smart_split(search_term):
+            if term.startswith(('"', "'")) and term[0] == term[-1]:
+                term = unescape_string_literal(term)
+            query = Q()
+            if term.isdigit():
+                for field in self.search_id_fields:
+                    query |= Q(**{field: int(term)})
+            for field in self.search_prefix_fields:
+                query |= Q(**{f"{field}__istartswith": term})
+            for field in contains_fields:
+                query |= Q(**{f"{field}__icontains": term})
+            queryset = queryset.filter(query)
+        return queryset, False
 
 
 @admin.register(EveEntity)
-class EveEntityAdmin(admin.ModelAdmin):
+class EveEntityAdmin(IndexedSearchMixin, LargeTableAdmin):
     list_display = ["eve_entity_id", "eve_entity_name", "eve_entity_type"]
     list_filter = ["eve_entity_type"]
-    search_fields = ["eve_entity_name"]
+    search_id_fields = ["eve_entity_id"]
+    search_prefix_fields = ["eve_entity_name"]
+    actions = ["resolve_unknown_names"]
+
+    @admin.action(description="Resolve unknown names")
+    def resolve_unknown_names(self, request, queryset):
+        tokens = list(Token.objects.usable().filter(scopes__contains=STRUCTURE_SCOPE))
+        updated = EveEntity.objects.update_unknowns(tokens, queryset.values_list("eve_entity_id", flat=True))
+        selected = queryset.count()
+        self.message_user(
+            request,
+            f"Resolved {len(updated)} of {selected} selected entities.",
+            messages.SUCCESS if updated else messages.WARNING,
+        )
 
 
 @admin.register(LoginAccessRight)
-class LoginAccessRightAdmin(admin.ModelAdmin):
+class LoginAccessRightAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ["entity", "entity__eve_entity_id", "entity__eve_entity_type"]
     list_filter = ["entity__eve_entity_type"]
-    search_fields = ["entity__eve_entity_type"]
+    list_select_related = ["entity"]
+    search_id_fields = ["entity__eve_entity_id"]
+    search_prefix_fields = ["entity__eve_entity_name"]
+    raw_id_fields = ["entity"]
 
 
 @admin.register(EveUser)
-class EveUserAdmin(UserAdmin):
+class EveUserAdmin(IndexedSearchMixin, UserAdmin, LargeTableAdmin):
     list_display = [
         "username",
         "character_name",
@@ -30,6 +159,9 @@ class EveUserAdmin(UserAdmin):
         "is_superuser",
         "is_active",
     ]
+    search_id_fields = ["character_id"]
+    search_prefix_fields = ["character_name", "username"]
+    search_fields = ["first_name", "last_name", "email"]
     fieldsets = UserAdmin.fieldsets + (
         (
             "Eve Online Identity",
@@ -39,5 +171,10 @@ class EveUserAdmin(UserAdmin):
 
 
 @admin.register(Token)
-class TokenAdmin(admin.ModelAdmin):
-    list_display = ["character_id", "character_name", "character_owner_hash", "scopes", "expires_at"]
+class TokenAdmin(IndexedSearchMixin, LargeTableAdmin):
+    list_display = ["character_id", "character_name", "character_owner_hash", "scopes", "expires_at", "status"]
+    list_filter = ["status"]
+    search_id_fields = ["character_id"]
+    search_prefix_fields = ["character_name"]
+    # Leave the access and refresh tokens out of the changelist query
+    list_only = list_display
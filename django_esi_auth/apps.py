@@ -1,6 +1,32 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class DjangoEsiAuthConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'django_esi_auth'
+
+    def ready(self):
+        if getattr(settings, "DJANGO_ESI_AUTH_METRICS", False):
+            from .instrumentation import collector
+
+            collector.connect()
+
+        if getattr(settings, "DJANGO_ESI_AUTH_PROFILE_CALLBACK", False):
+            from django.db.backends.signals import connection_created
+
+            from .profiling import install_query_counter
+
+            connection_created.connect(install_query_counter, dispatch_uid="esi-auth-profile-query-counter")
+
+        if getattr(settings, "DJANGO_ESI_AUTH_TOKEN_CACHE", False):
+            from django.db.models.signals import post_delete
+
+            from . import token_store
+
+            post_delete.connect(
+                lambda sender, instance, **kwargs: token_store.delete(instance.pk),
+                sender=self.get_model("Token"),
+                weak=False,
+                dispatch_uid="esi-auth-token-store-delete",
+            )
@@ -0,0 +1,58 @@
+import asyncio
+from functools import partial
+from typing import Any
+from weakref import WeakKeyDictionary
+
+import requests
+from asgiref.sync import sync_to_async
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# One client per event loop, httpx clients can't be shared across loops
+_clients: "WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = WeakKeyDictionary()
+
+DEFAULT_TIMEOUT = 10
+
+
+def backend() -> str:
+    return "httpx" if httpx is not None else "requests"
+
+
+def _client():
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = httpx.AsyncClient(timeout=DEFAULT_TIMEOUT)
+    return client
+
+
+async def request(method: str, url: str, **kwargs) -> Any:
+    """
+    Make an HTTP request without blocking the event loop.
+
+    Uses httpx when it is installed, otherwise runs requests in a worker thread.  Either way the
+    response has status_code, text, json() and raise_for_status().
+
+    Args:
+        method: HTTP method
+        url: Full URL
+        **kwargs: headers, params, data and timeout, as accepted by both libraries
+
+    Returns:
+        httpx.Response or requests.Response
+    """
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    if httpx is not None:
+        return await _client().request(method, url, **kwargs)
+    return await sync_to_async(partial(requests.request, method, url, **kwargs), thread_sensitive=False)()
+
+
+async def get(url: str, **kwargs) -> Any:
+    return await request("GET", url, **kwargs)
+
+
+async def post(url: str, **kwargs) -> Any:
+    return await request("POST", url, **kwargs)
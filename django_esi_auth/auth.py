@@ -1,16 +1,21 @@
 import hashlib
-import json
+import logging
 from datetime import timedelta
+from typing import Any, Dict, List
 
-import requests
 from django.conf import settings
 from django.contrib.auth.backends import BaseBackend
 from django.contrib.auth.models import AbstractBaseUser, Group
+from django.db.models import Q
 from django.http import HttpRequest
 from django.utils import timezone
 
 from .choices import EveEntityTypeEnum
 from .models import LoginAccessRight, EveUser
+from .profiling import profile_stage
+from .public_info import public_info
+
+logger = logging.getLogger(__name__)
 
 
 class EveAuthenticationBackend(BaseBackend):
@@ -25,6 +30,26 @@ class EveAuthenticationBackend(BaseBackend):
     ```
     """
 
+    @staticmethod
+    def _username(identity: Dict[str, Any]) -> str:
+        return (
+            hashlib.md5(f"{identity['character_id']}.{identity['character_owner_hash']}".encode()).hexdigest().upper()
+        )
+
+    @staticmethod
+    def _new_user(username: str, identity: Dict[str, Any], is_admin: bool) -> EveUser:
+        user = EveUser(
+            username=username,
+            is_superuser=is_admin,
+            is_staff=is_admin,
+            character_id=identity["character_id"],
+            character_owner_hash=identity["character_owner_hash"],
+            character_name=identity["character_name"],
+        )
+        user.first_name = identity["character_name"].split(" ")[0]
+        user.last_name = identity["character_name"].split(" ")[-1]
+        return user
+
     def authenticate(self, request: HttpRequest, **kwargs) -> AbstractBaseUser | None:
         user = None
         is_admin = False
@@ -38,26 +63,11 @@ class EveAuthenticationBackend(BaseBackend):
 
                 if token_response:
                     if token_response["identity"]["character_owner_hash"]:
-                        owner = (
-                            hashlib.md5(
-                                f"{token_response['identity']['character_id']}.{token_response['identity']['character_owner_hash']}".encode()
-                            )
-                            .hexdigest()
-                            .upper()
-                        )
+                        owner = self._username(token_response["identity"])
                         try:
                             user = EveUser.objects.get(username=owner)
                         except EveUser.DoesNotExist:
-                            user = EveUser(
-                                username=owner,
-                                is_superuser=is_admin,
-                                is_staff=is_admin,
-                                character_id=token_response["identity"]["character_id"],
-                                character_owner_hash=token_response["identity"]["character_owner_hash"],
-                                character_name=token_response["identity"]["character_name"],
-                            )
-                            user.first_name = token_response["identity"]["character_name"].split(" ")[0]
-                            user.last_name = token_response["identity"]["character_name"].split(" ")[-1]
+                            user = self._new_user(owner, token_response["identity"], is_admin)
                             user.save()
 
                             if settings.DJANGO_ESI_AUTH_DEFAULT_GROUP:
@@ -70,49 +80,111 @@ class EveAuthenticationBackend(BaseBackend):
 
         return None
 
+    async def aauthenticate(self, request: HttpRequest, **kwargs) -> AbstractBaseUser | None:
+        """
+        Async version of authenticate, uses the async ORM and doesn't block on the ESI lookup
+        """
+        user = None
+
+        if "password" in kwargs or not kwargs.get("token_response"):
+            return None
+
+        identity = kwargs["token_response"]["identity"]
+        if identity["character_owner_hash"]:
+            owner = self._username(identity)
+            try:
+                user = await EveUser.objects.aget(username=owner)
+            except EveUser.DoesNotExist:
+                is_admin = not await EveUser.objects.aexists()
+                user = self._new_user(owner, identity, is_admin)
+                await user.asave()
+
+                if settings.DJANGO_ESI_AUTH_DEFAULT_GROUP:
+                    group = await Group.objects.aget(name=settings.DJANGO_ESI_AUTH_DEFAULT_GROUP)
+                    await user.groups.aadd(group)
+
+        if user is not None and await self.ahas_login_rights(user):
+            return user
+
+        return None
+
     def get_user(self, user_id):
         try:
             return EveUser.objects.get(pk=user_id)
         except EveUser.DoesNotExist:
             return None
 
+    async def aget_user(self, user_id):
+        try:
+            return await EveUser.objects.aget(pk=user_id)
+        except EveUser.DoesNotExist:
+            return None
+
     def has_login_rights(self, user: EveUser) -> bool:
 
         if user.is_superuser:
             return True
 
         if user.last_access_check is None or user.last_access_check < timezone.now() - timedelta(days=1):
-            public_data = self.get_public_character_data(user.character_id)
-            user.corporation_id = public_data.get("corporation_id", None)
-            user.alliance_id = public_data.get("alliance_id", None)
-            user.last_access_check = timezone.now()
-            user.save()
-
-        if (
-            LoginAccessRight.objects.filter(
-                entity__eve_entity_id=user.character_id,
-                entity__eve_entity_type=EveEntityTypeEnum.CHARACTER,
-            ).exists()
-            or LoginAccessRight.objects.filter(
-                entity__eve_entity_id=user.alliance_id,
-                entity__eve_entity_type=EveEntityTypeEnum.ALLIANCE,
-            ).exists()
-            or LoginAccessRight.objects.filter(
-                entity__eve_entity_id=user.corporation_id,
-                entity__eve_entity_type=EveEntityTypeEnum.CORPORATION,
-            ).exists()
-        ):
+            with profile_stage("public_data"):
+                public_data = self.get_public_character_data(user.character_id)
+            if self._apply_public_data(user, public_data):
+                user.save()
+
+        with profile_stage("access_rights"):
+            return self._has_access_right(user)
+
+    async def ahas_login_rights(self, user: EveUser) -> bool:
+
+        if user.is_superuser:
             return True
 
+        if user.last_access_check is None or user.last_access_check < timezone.now() - timedelta(days=1):
+            with profile_stage("public_data"):
+                public_data = await self.aget_public_character_data(user.character_id)
+            if self._apply_public_data(user, public_data):
+                await user.asave()
+
+        with profile_stage("access_rights"):
+            return await self._ahas_access_right(user)
+
+    @staticmethod
+    def _apply_public_data(user: EveUser, public_data: Dict[str, Any] | None) -> bool:
+        """
+        Returns:
+            bool: False if the lookup failed, the stored corporation and alliance are then checked and the
+            next login looks up again
+        """
+        if public_data is None:
+            logger.warning(f"Public data lookup failed for {user.character_id}, checking stored affiliations")
+            return False
+
+        user.corporation_id = public_data.get("corporation_id", None)
+        user.alliance_id = public_data.get("alliance_id", None)
+        user.last_access_check = timezone.now()
+        return True
+
+    @staticmethod
+    def _access_right_filters(user: EveUser) -> List[Q]:
+        return [
+            Q(entity__eve_entity_id=user.character_id, entity__eve_entity_type=EveEntityTypeEnum.CHARACTER),
+            Q(entity__eve_entity_id=user.alliance_id, entity__eve_entity_type=EveEntityTypeEnum.ALLIANCE),
+            Q(entity__eve_entity_id=user.corporation_id, entity__eve_entity_type=EveEntityTypeEnum.CORPORATION),
+        ]
+
+    @classmethod
+    def _has_access_right(cls, user: EveUser) -> bool:
+        return any(LoginAccessRight.objects.filter(f).exists() for f in cls._access_right_filters(user))
+
+    @classmethod
+    async def _ahas_access_right(cls, user: EveUser) -> bool:
+        for f in cls._access_right_filters(user):
+            if await LoginAccessRight.objects.filter(f).aexists():
+                return True
         return False
 
     def get_public_character_data(self, character_id):
-        response = requests.get(
-            f"https://esi.evetech.net/latest/characters/{character_id}/?datasource=tranquility",
-            timeout=10,
-        )
-
-        if response:
-            return json.loads(response.text)
+        return public_info.get(EveEntityTypeEnum.CHARACTER, character_id)
 
-        return None
+    async def aget_public_character_data(self, character_id):
+        return await public_info.aget(EveEntityTypeEnum.CHARACTER, character_id)
@@ -0,0 +1,178 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple
+
+from django.db import connection
+from django.utils import timezone
+
+from .client import ESIClient, ESIResponse
+from .exceptions import EveTokenRevokedError
+from .models import Token
+
+logger = logging.getLogger(__name__)
+
+
+class BatchJob(NamedTuple):
+    """
+    One ESI call to make as part of a batch
+
+    endpoint is either an ESIClient method name (get_character_journal) or a registry operation ID.
+    key is handed back untouched on the result so callers can match results to their own records.
+    """
+
+    endpoint: str
+    params: Dict[str, Any]
+    token: Token | None = None
+    key: Any = None
+
+
+class BatchResult:
+    """Outcome of a single BatchJob, errors are reported here rather than raised"""
+
+    __slots__ = ("job", "response", "exception")
+
+    def __init__(self, job: BatchJob, response: ESIResponse = None, exception: Exception = None):
+        self.job = job
+        self.response = response
+        self.exception = exception
+
+    def __repr__(self):
+        return f"<BatchResult {self.job.endpoint} ok={self.ok}>"
+
+    @property
+    def ok(self) -> bool:
+        return self.exception is None and self.response is not None and not self.response.err
+
+    @property
+    def error(self) -> str | None:
+        if self.exception is not None:
+            return str(self.exception)
+        if self.response is not None:
+            return self.response.err
+        return None
+
+    @property
+    def data(self) -> Any:
+        return self.response.data if self.response is not None else None
+
+
+def _close_thread_connection():
+    # Worker threads get their own DB connection when a token refresh saves, don't leak it
+    if connection.connection is not None:
+        connection.close()
+
+
+class BatchExecutor:
+    """
+    Runs many ESI calls, across many tokens, with bounded concurrency.
+
+    Expired tokens are refreshed once per token before their jobs are dispatched and jobs for
+    quarantined tokens fail without a request.  Every request shares the process wide ESI error
+    limit budget and results are yielded as they finish.
+    """
+
+    def __init__(self, max_workers: int = 8, refresh_margin: timedelta = timedelta(seconds=60)):
+        self.max_workers = max_workers
+        self.refresh_margin = refresh_margin
+        self._token_locks: Dict[int, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def run(self, jobs: Iterable[BatchJob]) -> Iterator[BatchResult]:
+        """
+        Execute the jobs, yielding a BatchResult for each as soon as it completes
+
+        Args:
+            jobs: Jobs to run, in any order
+
+        Returns:
+            Iterator of results in completion order
+        """
+        jobs = list(jobs)
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="esi-batch")
+        try:
+            failed_tokens = self._refresh_tokens(pool, jobs)
+            clients: Dict[Any, ESIClient] = {}
+            futures = []
+
+            for job in jobs:
+                token_key = self._token_key(job.token)
+                if token_key in failed_tokens:
+                    yield BatchResult(job, exception=failed_tokens[token_key])
+                    continue
+                if token_key not in clients:
+                    clients[token_key] = ESIClient(job.token)
+                futures.append(pool.submit(self._execute, job, clients[token_key]))
+
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def run_all(self, jobs: Iterable[BatchJob]) -> List[BatchResult]:
+        return list(self.run(jobs))
+
+    @staticmethod
+    def _token_key(token: Token | None) -> Any:
+        if token is None:
+            return None
+        return token.pk if token.pk is not None else id(token)
+
+    def _token_lock(self, token: Token) -> threading.Lock:
+        key = self._token_key(token)
+        with self._locks_lock:
+            lock = self._token_locks.get(key)
+            if lock is None:
+                lock = self._token_locks[key] = threading.Lock()
+            return lock
+
+    def _refresh_tokens(self, pool: ThreadPoolExecutor, jobs: List[BatchJob]) -> Dict[Any, Exception]:
+        cutoff = timezone.now() + self.refresh_margin
+        tokens = {}
+        failed = {}
+        for job in jobs:
+            if job.token is None:
+                continue
+            key = self._token_key(job.token)
+            if job.token.is_quarantined:
+                # Don't spend SSO calls on tokens that keep failing
+                failed[key] = EveTokenRevokedError(f"Token for {job.token.character_name} is quarantined")
+            elif job.token.expires_at <= cutoff:
+                tokens.setdefault(key, job.token)
+
+        futures = {pool.submit(self._refresh, token): key for key, token in tokens.items()}
+        for future in as_completed(futures):
+            exception = future.result()
+            if exception is not None:
+                failed[futures[future]] = exception
+        return failed
+
+    def _refresh(self, token: Token) -> Exception | None:
+        try:
+            with self._token_lock(token):
+                token.refresh()
+        except Exception as e:
+            logger.warning(f"Failed to refresh token for {token.character_name}: {e}")
+            return e
+        finally:
+            _close_thread_connection()
+        return None
+
+    def _execute(self, job: BatchJob, client: ESIClient) -> BatchResult:
+        try:
+            if job.token is not None:
+                # Serialise refreshes if the token expires mid batch
+                with self._token_lock(job.token):
+                    job.token.access_token
+
+            method = getattr(client, job.endpoint, None)
+            if callable(method) and job.endpoint.startswith("get_"):
+                response = method(**job.params)
+            else:
+                response = client.call(job.endpoint, **job.params)
+            return BatchResult(job, response=response)
+        except Exception as e:
+            return BatchResult(job, exception=e)
+        finally:
+            _close_thread_connection()
@@ -0,0 +1,199 @@
+import base64
+import hashlib
+import json
+import mmap
+import os
+import threading
+from collections import defaultdict
+from datetime import timedelta
+from time import perf_counter, sleep
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from .client import ESIClient
+from .decoders import get_decoder
+from .exceptions import ESICassetteError
+
+RECORD = "record"
+REPLAY = "replay"
+
+# Describe the body as it was on the wire, the recorded body is already decoded
+DROPPED_HEADERS = {"content-encoding", "transfer-encoding", "content-length", "connection", "set-cookie"}
+
+
+def request_key(request: requests.PreparedRequest) -> str:
+    """
+    Identify a request independent of host, header order, query order and credentials
+
+    Args:
+        request: Prepared request
+
+    Returns:
+        Method, path and sorted query, body digest and If-None-Match, separated by spaces
+    """
+    url = urlsplit(request.url)
+    query = urlencode(sorted(parse_qsl(url.query, keep_blank_values=True)))
+    body = request.body or b""
+    if isinstance(body, str):
+        body = body.encode()
+    digest = hashlib.blake2b(body, digest_size=8).hexdigest() if body else "-"
+    etag = request.headers.get("If-None-Match") or "-"
+    return f"{request.method} {url.path}?{query} {digest} {etag}"
+
+
+class CassetteAdapter(BaseAdapter):
+    """
+    requests transport that records every exchange to a cassette file or replays them from it.
+
+    The file has one line per exchange, the request key, a tab and the response as JSON.  Recording
+    appends through a real HTTPAdapter.  Replaying memory maps the file and only indexes the keys up
+    front, a response is parsed when it is served.  Identical requests are answered in the order they
+    were recorded and the last answer is repeated once they run out, so a replay is deterministic.
+    """
+
+    def __init__(self, path: str | os.PathLike, mode: str = REPLAY, latency: float | str = 0.0):
+        """
+        Args:
+            path: Cassette file
+            mode: "record" or "replay"
+            latency: Seconds to wait before each replayed response, or "recorded" to wait as long as the original
+        """
+        super().__init__()
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode {mode}")
+
+        self.path = os.fspath(path)
+        self.mode = mode
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._file = None
+        self._mmap = None
+        self._index: Dict[str, List[Tuple[int, int]]] = {}
+        self._served: Dict[str, int] = defaultdict(int)
+
+        if mode == RECORD:
+            self._http = HTTPAdapter()
+            self._file = open(self.path, "ab")
+        else:
+            self._load_index()
+
+    def _load_index(self):
+        self._file = open(self.path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if not size:
+            return
+
+        self._mmap = mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        index = defaultdict(list)
+        position = 0
+        while position < size:
+            end = mm.find(b"\n", position)
+            if end == -1:
+                end = size
+            tab = mm.find(b"\t", position, end)
+            if tab != -1:
+                index[mm[position:tab].decode()].append((tab + 1, end))
+            position = end + 1
+        self._index = dict(index)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._index.values())
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        if self.mode == RECORD:
+            return self._record(request, **kwargs)
+        return self._replay(request)
+
+    def _record(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        started = perf_counter()
+        response = self._http.send(request, **kwargs)
+        content = response.content
+        entry: Dict[str, Any] = {
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {k: v for k, v in response.headers.items() if k.lower() not in DROPPED_HEADERS},
+            "elapsed": round(perf_counter() - started, 6),
+        }
+        try:
+            entry["body"] = content.decode()
+        except UnicodeDecodeError:
+            entry["body_b64"] = base64.b64encode(content).decode()
+
+        line = f"{request_key(request)}\t{json.dumps(entry, separators=(',', ':'))}\n".encode()
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+        return response
+
+    def _replay(self, request: requests.PreparedRequest) -> requests.Response:
+        key = request_key(request)
+        with self._lock:
+            entries = self._index.get(key)
+            if not entries:
+                raise ESICassetteError(f"No recorded response for {key} in {self.path}")
+            start, end = entries[min(self._served[key], len(entries) - 1)]
+            self._served[key] += 1
+            raw = self._mmap[start:end]
+
+        entry = get_decoder().loads(raw)
+        delay = entry["elapsed"] if self.latency == "recorded" else self.latency
+        if delay:
+            sleep(delay)
+
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = entry.get("reason")
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response._content = entry["body"].encode() if "body" in entry else base64.b64decode(entry["body_b64"])
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(seconds=entry["elapsed"])
+        return response
+
+    def close(self):
+        if self.mode == RECORD:
+            self._http.close()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class Cassette:
+    """
+    Routes every ESIClient request through a CassetteAdapter while active
+
+    ```
+    with Cassette("journal.cassette", mode="record"):
+        DeltaSync(token).character_journal(character_id)
+
+    with Cassette("journal.cassette", latency=0.05):
+        DeltaSync(token).character_journal(character_id)  # same responses, no network
+    ```
+    """
+
+    def __init__(self, path: str | os.PathLike, mode: str = REPLAY, latency: float | str = 0.0):
+        self.adapter = CassetteAdapter(path, mode, latency)
+        self._previous = None
+
+    def session(self) -> requests.Session:
+        session = requests.Session()
+        session.mount("http://", self.adapter)
+        session.mount("https://", self.adapter)
+        return session
+
+    def __enter__(self) -> "Cassette":
+        self._previous = ESIClient.default_session
+        ESIClient.default_session = self.session()
+        return self
+
+    def __exit__(self, *exc):
+        ESIClient.default_session = self._previous
+        self.adapter.close()
@@ -8,3 +8,9 @@ class EveEntityTypeEnum(models.TextChoices):
     STATION = "station", "Station"
     STRUCTURE = "structure", "Structure"
     UNKNOWN = "unknown", "Unknown"
+
+
+class TokenStatusEnum(models.TextChoices):
+    VALID = "valid", "Valid"
+    FAILING = "failing", "Failing"
+    REVOKED = "revoked", "Revoked"
@@ -1,43 +1,78 @@
 import json
 import logging
+import threading
 from datetime import datetime
 from email.utils import parsedate_to_datetime
-from time import sleep
-from typing import Any, List, Union
+from time import monotonic, perf_counter, sleep
+from typing import Any, Iterator, List, Type, Union
 
 import requests
+from django.conf import settings
 
+from . import signals
+from .decoders import get_decoder
+from .endpoints import get_endpoint, get_registry
 from .exceptions import ESIRequestError, ESIResponseDecodeError
+from .instrumentation import endpoint_label
 from .models import Token
+from .records import RECORD_TYPES, R, decode_records, iter_records
+from .utils import esi_url
 
 logger = logging.getLogger(__name__)
 
 
-class ESIResponse:
-    """Response class for ESI API calls"""
+_UNSET = object()
+
 
-    def __init__(self, response: requests.Response, request: requests.Request = None):
+class ESIResponse:
+    """
+    Response class for ESI API calls
+
+    Headers are only parsed when their property is first read.  With keep_response=False the raw
+    requests.Response is released once the body is decoded, so only the data and headers are retained.
+    """
+
+    __slots__ = (
+        "_request",
+        "_response",
+        "_headers",
+        "_status_code",
+        "_err",
+        "_page",
+        "_total_pages",
+        "_next_page",
+        "_etag",
+        "_expires",
+        "_last_modified",
+        "_data",
+    )
+
+    def __init__(self, response: requests.Response, request: requests.Request = None, keep_response: bool = True):
+        headers = response.headers
         self._request = request
-        self._response = response
+        self._response = response if keep_response else None
+        self._headers = headers
+        self._status_code = response.status_code
         self._err = None
         self._page = request.params.get("page", 1) or 1
-        self._total_pages = int(response.headers.get("x-pages", 1))
+        self._total_pages = int(headers.get("x-pages", 1))
         self._next_page = None
-        self._etag = response.headers["ETag"].strip('"') if "ETag" in response.headers else None
-        self._expires = parsedate_to_datetime(response.headers["expires"]) if "expires" in response.headers else None
-        self._last_modified = (
-            parsedate_to_datetime(response.headers["last-modified"]) if "last-modified" in response.headers else None
-        )
+        self._etag = _UNSET
+        self._expires = _UNSET
+        self._last_modified = _UNSET
         self._data = []
 
         if 200 <= response.status_code <= 299:
             # Set next page if we have one
             if self._page + 1 <= self._total_pages:
                 request.params["page"] = self._page + 1
+                # The ETag belongs to the first page, another page matching it would come back empty
+                request.headers.pop("If-None-Match", None)
                 self._next_page = request
+            decoder = get_decoder()
             try:
-                self._data = response.json()
-            except json.decoder.JSONDecodeError as e:
+                self._data = decoder.loads(response.content)
+            except decoder.errors as e:
                 raise ESIResponseDecodeError(f"Failed to decode response from ESI.\n{response.text}\n\n{e}")
 
         elif response.status_code == 304:
@@ -46,6 +81,10 @@ class ESIResponse:
         else:
             self._err = f"{response.status_code} :: {response.text}"
 
+    def _date_header(self, name: str) -> datetime | None:
+        value = self._headers.get(name)
+        return parsedate_to_datetime(value) if value else None
+
     @property
     def page(self) -> int:
         return self._page
@@ -54,22 +93,47 @@ class ESIResponse:
     def total_pages(self) -> int:
         return self._total_pages
 
+    @property
+    def status_code(self) -> int:
+        return self._status_code
+
+    @property
+    def headers(self):
+        return self._headers
+
     @property
     def etag(self) -> str:
+        if self._etag is _UNSET:
+            etag = self._headers.get("ETag")
+            self._etag = etag.strip('"') if etag else None
         return self._etag
 
     @property
     def expires(self) -> datetime:
+        if self._expires is _UNSET:
+            self._expires = self._date_header("expires")
         return self._expires
 
     @property
     def last_modified(self) -> datetime:
+        if self._last_modified is _UNSET:
+            self._last_modified = self._date_header("last-modified")
         return self._last_modified
 
     @property
     def data(self) -> List[Any]:
         return self._data
 
+    def as_records(self, record_type: Type[R]) -> List[R]:
+        """
+        Args:
+            record_type: Record class from django_esi_auth.records
+
+        Returns:
+            The response rows decoded into typed records
+        """
+        return decode_records(record_type, self._data)
+
     @property
     def next_page(self) -> requests.Request:
         return self._next_page
@@ -83,25 +147,84 @@ class ESIResponse:
         return self._request
 
     @property
-    def response(self) -> requests.Response:
+    def response(self) -> requests.Response | None:
+        """The raw response, None when the client was created with keep_response=False"""
         return self._response
 
 
+class ErrorLimitBudget:
+    """
+    ESI error limit shared by every client in the process.
+
+    Tracks the x-esi-error-limit-remain/-reset headers and blocks new requests until the
+    window resets once the remaining budget drops to the threshold.
+    """
+
+    def __init__(self, threshold: int = None):
+        self._threshold = threshold
+        self._lock = threading.Lock()
+        self.remain = None
+        self._reset_at = None
+
+    @property
+    def threshold(self) -> int:
+        if self._threshold is None:
+            return getattr(settings, "DJANGO_ESI_AUTH_ERROR_LIMIT_THRESHOLD", 10)
+        return self._threshold
+
+    def update(self, headers):
+        if "x-esi-error-limit-remain" not in headers:
+            return
+        with self._lock:
+            self.remain = int(headers["x-esi-error-limit-remain"])
+            self._reset_at = monotonic() + int(headers.get("x-esi-error-limit-reset", 60))
+
+    def wait(self):
+        with self._lock:
+            if self.remain is None or self.remain > self.threshold:
+                return
+            delay = self._reset_at - monotonic()
+            if delay <= 0:
+                self.remain = None
+                return
+
+        logger.warning(f"ESI error limit at {self.remain}, pausing requests for {delay:.0f}s")
+        sleep(delay)
+
+
+error_limit = ErrorLimitBudget()
+
+
 class ESIClient:
 
-    def __init__(self, token: Union[Token | None] = None):
+    # Session used by clients created without one, see django_esi_auth.cassette
+    default_session: requests.Session | None = None
+
+    def __init__(
+        self,
+        token: Union[Token | None] = None,
+        keep_response: bool = True,
+        session: requests.Session = None,
+        retry: bool = True,
+    ):
         """
         Creates a new ESI Client class.  If no token is provided then only public endpoints will function.
         Args:
             token: Token to use for authenticated endpoints
+            keep_response: Keep the raw requests.Response on each ESIResponse, disable to save memory
+            session: Session to send requests with, e.g. one with a custom transport adapter mounted
+            retry: Wait and retry server errors and timeouts, disable on request paths such as login
         """
         self.headers = {
             "X-User-Agent": "Eve Broker v1 (fecal.matters@binarymethod.com)",
             "Accept": "application/json",
             "Content-Type": "application/json",
         }
-        self.base_url = "https://esi.evetech.net"
+        self.base_url = esi_url()
         self.token = token
+        self.keep_response = keep_response
+        self.session = session
+        self.retry = retry
 
     def get_character_contracts(self, character_id: int, etag=None, **kwargs) -> ESIResponse:
         return self._get_response(
@@ -146,6 +269,7 @@ class ESIClient:
             character_id=character_id,
             etag=etag,
             success_code=200,
+            **kwargs,
         )
 
     def get_character_journal(self, character_id: int, etag=None, **kwargs) -> ESIResponse:
@@ -157,6 +281,27 @@ class ESIClient:
             success_code=200,
         )
 
+    def get_corporation_journal(self, corporation_id: int, division: int = 1, etag=None, **kwargs) -> ESIResponse:
+        return self._get_response(
+            "GET",
+            "/corporations/{corporation_id}/wallets/{division}/journal/",
+            corporation_id=corporation_id,
+            division=division,
+            etag=etag,
+            success_code=200,
+        )
+
+    def get_corporation_transactions(self, corporation_id: int, division: int = 1, etag=None, **kwargs) -> ESIResponse:
+        return self._get_response(
+            "GET",
+            "/corporations/{corporation_id}/wallets/{division}/transactions/",
+            corporation_id=corporation_id,
+            division=division,
+            etag=etag,
+            success_code=200,
+            **kwargs,
+        )
+
     def get_structure(self, structure_id: int, etag=None, **kwargs) -> ESIResponse:
         return self._get_response(
             "GET",
@@ -181,29 +326,91 @@ class ESIClient:
             public=True,
         )
 
+    def get_public_corporation_data(self, corporation_id: int, etag=None, **kwargs) -> ESIResponse:
+        return self._get_response(
+            "GET",
+            "/corporations/{corporation_id}/",
+            corporation_id=corporation_id,
+            etag=etag,
+            success_code=200,
+            no_page=True,
+            public=True,
+        )
+
+    def get_public_alliance_data(self, alliance_id: int, etag=None, **kwargs) -> ESIResponse:
+        return self._get_response(
+            "GET",
+            "/alliances/{alliance_id}/",
+            alliance_id=alliance_id,
+            etag=etag,
+            success_code=200,
+            no_page=True,
+            public=True,
+        )
+
     def get_page(self, request: requests.Request) -> ESIResponse:
         return self._send_request(request)
 
-    def _get_response(self, method: str, endpoint: str, **kwargs: Any) -> ESIResponse:
-        result = None
+    def iter_pages(self, response: ESIResponse) -> Iterator[ESIResponse]:
+        """
+        Yield the response followed by each remaining page, fetching one page at a time
+        Args:
+            response: First page
+
+        Returns:
+            Iterator of ESIResponse
+        """
+        yield response
+        while response.next_page:
+            response = self.get_page(response.next_page)
+            yield response
+
+    def iter_records(self, endpoint: str, record_type: Type[R] = None, **kwargs: Any) -> Iterator[R]:
+        """
+        Stream every row of a paginated endpoint as typed records, one page is held in memory at a time
+        Args:
+            endpoint: ESIClient method name, e.g. get_character_journal
+            record_type: Record class, defaults to the one registered for the method in RECORD_TYPES
+            **kwargs: Arguments for the method
 
+        Returns:
+            Iterator of records
+        """
+        record_type = record_type or RECORD_TYPES[endpoint]
+        first_page = getattr(self, endpoint)(**kwargs)
+        for page in self.iter_pages(first_page):
+            if page.err:
+                raise ESIRequestError(f"Failed to fetch {endpoint} page {page.page}: {page.err}")
+            yield from iter_records(record_type, page.data)
+
+    def call(self, operation_id: str, **kwargs: Any) -> ESIResponse:
+        """
+        Call any route in the ESI endpoint registry by its swagger operation ID
+        Args:
+            operation_id: Operation ID, e.g. get_characters_character_id_wallet_journal
+            **kwargs: Path and query parameters plus the usual etag, data, public, all and allow_401 options
+
+        Returns:
+            ESIResponse
+        """
+        endpoint = get_registry().get(operation_id)
+        return self._get_response(endpoint.method, endpoint.path, **kwargs)
+
+    def _get_response(self, method: str, endpoint: str, **kwargs: Any) -> ESIResponse:
+        route = get_endpoint(method, endpoint)
         headers = self.headers.copy()
 
-        if "public" in kwargs:
-            if not kwargs["public"]:
-                headers["Authorization"] = f"Bearer {self.token.access_token}"
-            kwargs.pop("public")
-        else:
+        if not kwargs.pop("public", route.public):
             headers["Authorization"] = f"Bearer {self.token.access_token}"
 
-        if "page" not in kwargs:
-            if "no_page" in kwargs:
-                kwargs.pop("no_page")
-            else:
-                kwargs["page"] = 1
+        # Routes known from the spec only get a page parameter when ESI paginates them
+        no_page = kwargs.pop("no_page", route.from_spec and not route.paginated)
+        if "page" not in kwargs and not no_page:
+            kwargs["page"] = 1
 
-        if "etag" in kwargs and kwargs["etag"]:
-            headers["If-None-Match"] = kwargs.pop("etag")
+        etag = kwargs.pop("etag", None)
+        if etag:
+            headers["If-None-Match"] = etag
 
         data = None
         if "data" in kwargs:
@@ -211,75 +418,109 @@ class ESIClient:
             if type(data) is not str:
                 data = json.dumps(data)
 
-        params = {}
-        for key, value in kwargs.items():
-            if key != "success_code" and f"{key}" not in endpoint and key != "etag" and key != "all":
-                params[key] = value
+        fetch_all = kwargs.pop("all", False)
+        allow_401 = kwargs.pop("allow_401", False)
+        kwargs.pop("success_code", None)
 
-        url = f"{self.base_url}{str.format(endpoint, **kwargs)}"
+        # Path parameters are consumed, whatever is left is the query string
+        url = f"{self.base_url}{route.build_path(kwargs)}"
+        params = kwargs
 
         request = requests.Request(method, url, headers=headers, params=params, data=data)
-        result = self._send_request(request, kwargs.get("allow_401", False))
+        started = perf_counter()
+        result = self._send_request(request, allow_401)
 
-        if "all" in kwargs:
+        if fetch_all:
             next_page = result
             for page in range(result.page + 1, result.total_pages + 1):
                 next_page = self._send_request(next_page.next_page)
 
-                result.data += next_page.data
+                result.data.extend(next_page.data)
+
+            signals.esi_pages_fetched.send(
+                sender=self.__class__,
+                endpoint=endpoint_label(url),
+                pages=result.total_pages - result.page + 1,
+                elapsed=perf_counter() - started,
+            )
 
         return result
 
     def _send_request(self, request: requests.Request, allow_401: bool = False) -> ESIResponse:
-        session = requests.Session()
+        session = self.session or ESIClient.default_session or requests.Session()
+        endpoint = endpoint_label(request.url)
+        signals.esi_request_started.send(
+            sender=self.__class__, method=request.method, endpoint=endpoint, request=request
+        )
 
+        started = perf_counter()
+        response = None
+        result = None
         retries = 0
-        while retries < 6:
-            try:
-                response = session.send(request.prepare(), timeout=(6, 10))
-
-                response.raise_for_status()
-
-                if 200 <= response.status_code <= 299 or response.status_code == 304:
-                    break
-
-                sleep(60)
-                retries += 1
-            except requests.exceptions.Timeout:
-                sleep(60)
-                retries += 1
-            except requests.exceptions.HTTPError:
-                if response.status_code == 401:
-                    logger.error(f"Unauthorized response for {request.url}")
-                    if allow_401:
-                        logger.info("401 Unauthorized ignored")
-                        return ESIResponse(response, request)
-                if response.status_code == 403:
-                    return ESIResponse(response, request)
-                sleep(60)
-                retries += 1
-        else:
-            raise ESIRequestError(f"Max retries exceeded for {request.url}")
-
-        return ESIResponse(response, request)
-
-        if "page" in request.params:
-            if request.params["page"] < int(response.headers.get("x-pages", 1)):
-                current_page = request.params["page"]
-                request.params["page"] += 1
-                result = ESIResponse(headers=response.headers, next_page=request, page=current_page)
+        try:
+            while retries < 6:
+                try:
+                    error_limit.wait()
+                    response = session.send(request.prepare(), timeout=(6, 10))
+                    error_limit.update(response.headers)
+
+                    response.raise_for_status()
+
+                    if 200 <= response.status_code <= 299 or response.status_code == 304 or not self.retry:
+                        break
+
+                    sleep(60)
+                    retries += 1
+                except requests.exceptions.Timeout:
+                    if not self.retry:
+                        raise ESIRequestError(f"Timed out requesting {request.url}")
+                    sleep(60)
+                    retries += 1
+                except requests.exceptions.HTTPError:
+                    if response.status_code == 401:
+                        logger.error(f"Unauthorized response for {request.url}")
+                        if allow_401:
+                            logger.info("401 Unauthorized ignored")
+                            break
+                    # Forbidden and Not Found won't change on a retry
+                    if response.status_code in (403, 404) or not self.retry:
+                        break
+                    sleep(60)
+                    retries += 1
             else:
-                result = ESIResponse(headers=response.headers)
-        else:
-            result = ESIResponse(headers=response.headers)
-
-        if response.status_code == 304:
-            result.data = []
-            return result
+                raise ESIRequestError(f"Max retries exceeded for {request.url}")
 
-        try:
-            result.data = response.json()
-        except json.decoder.JSONDecodeError as e:
-            raise ESIResponseDecodeError(f"Failed to decode response from ESI.\n{response.text}\n\n{e}")
+            result = ESIResponse(response, request, self.keep_response)
+        finally:
+            self._request_finished(request, endpoint, response, result, perf_counter() - started, retries)
 
         return result
+
+    def _request_finished(
+        self,
+        request: requests.Request,
+        endpoint: str,
+        response: requests.Response | None,
+        result: ESIResponse | None,
+        elapsed: float,
+        retries: int,
+    ):
+        if not signals.esi_request_finished.has_listeners(self.__class__):
+            return
+
+        error_limit_remain = None
+        if response is not None and "x-esi-error-limit-remain" in response.headers:
+            error_limit_remain = int(response.headers["x-esi-error-limit-remain"])
+
+        signals.esi_request_finished.send(
+            sender=self.__class__,
+            method=request.method,
+            endpoint=endpoint,
+            status_code=response.status_code if response is not None else None,
+            elapsed=elapsed,
+            retries=retries,
+            response_bytes=len(response.content) if response is not None else 0,
+            error_limit_remain=error_limit_remain,
+            request=request,
+            result=result,
+        )
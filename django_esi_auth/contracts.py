@@ -0,0 +1,91 @@
+import logging
+from typing import Any, Dict, Iterable, List
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .batch import BatchExecutor, BatchJob
+from .models import Token
+from .records import Contract
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = "esi_auth:contract_items:{contract_id}"
+
+# Items of deleted contracts are gone from ESI
+SKIPPED_STATUSES = {"deleted"}
+
+
+class ContractItemsFetcher:
+    """
+    Fetches items for many contracts at once.
+
+    Contract items never change once a contract exists, so fetched items are cached (forever by
+    default, see DJANGO_ESI_AUTH_CONTRACT_ITEMS_TIMEOUT) and only uncached contracts hit ESI,
+    concurrently through a BatchExecutor.
+    """
+
+    def __init__(self, token: Token, executor: BatchExecutor = None):
+        self.token = token
+        self.executor = executor or BatchExecutor()
+
+    @staticmethod
+    def _contract_id(contract: Dict[str, Any] | Contract) -> int:
+        return contract.contract_id if isinstance(contract, Contract) else contract["contract_id"]
+
+    @staticmethod
+    def _status(contract: Dict[str, Any] | Contract) -> str | None:
+        return contract.status if isinstance(contract, Contract) else contract.get("status")
+
+    def fetch_character(self, character_id: int, contracts: Iterable[Dict[str, Any] | Contract]):
+        return self.fetch(contracts, "get_character_contract_items", {"character_id": character_id})
+
+    def fetch_corporation(self, corporation_id: int, contracts: Iterable[Dict[str, Any] | Contract]):
+        return self.fetch(contracts, "get_corporation_contract_items", {"corporation_id": corporation_id})
+
+    def fetch(
+        self, contracts: Iterable[Dict[str, Any] | Contract], endpoint: str, params: Dict[str, Any]
+    ) -> Dict[int, List[Dict[str, Any]] | None]:
+        """
+        Get the items of every contract, from cache where possible
+
+        Args:
+            contracts: Output of get_character_contracts/get_corporation_contracts, dicts or Contract records
+            endpoint: ESIClient items method
+            params: Owner parameter for the items method
+
+        Returns:
+            Items by contract ID, None for contracts whose items could not be fetched (e.g. 401 Unauthorized)
+        """
+        contract_ids = [
+            self._contract_id(contract) for contract in contracts if self._status(contract) not in SKIPPED_STATUSES
+        ]
+        if not contract_ids:
+            return {}
+
+        keys = {CACHE_KEY.format(contract_id=contract_id): contract_id for contract_id in contract_ids}
+        cached = cache.get_many(keys.keys())
+        results: Dict[int, List[Dict[str, Any]] | None] = {keys[key]: items for key, items in cached.items()}
+
+        jobs = [
+            BatchJob(endpoint, {**params, "contract_id": contract_id}, self.token, key=contract_id)
+            for contract_id in contract_ids
+            if contract_id not in results
+        ]
+
+        to_cache = {}
+        for result in self.executor.run(jobs):
+            contract_id = result.job.key
+            if result.ok:
+                results[contract_id] = result.data
+                to_cache[CACHE_KEY.format(contract_id=contract_id)] = result.data
+            else:
+                # Not cached, access may be granted later
+                logger.info(f"Items for contract {contract_id} unavailable: {result.error}")
+                results[contract_id] = None
+
+        if to_cache:
+            cache.set_many(to_cache, timeout=getattr(settings, "DJANGO_ESI_AUTH_CONTRACT_ITEMS_TIMEOUT", None))
+
+        logger.debug(f"Contract items: {len(cached)} cached, {len(jobs)} fetched")
+        return results
@@ -0,0 +1,53 @@
+import json
+from functools import cache
+from typing import Any, Callable, NamedTuple, Tuple, Type
+
+from django.conf import settings
+
+
+class JSONDecoder(NamedTuple):
+    name: str
+    loads: Callable[[bytes], Any]
+    errors: Tuple[Type[Exception], ...]
+
+
+def _stdlib_decoder() -> JSONDecoder:
+    return JSONDecoder("json", json.loads, (json.decoder.JSONDecodeError, UnicodeDecodeError))
+
+
+def _orjson_decoder() -> JSONDecoder:
+    import orjson
+
+    return JSONDecoder("orjson", orjson.loads, (orjson.JSONDecodeError,))
+
+
+def _msgspec_decoder() -> JSONDecoder:
+    import msgspec
+
+    return JSONDecoder("msgspec", msgspec.json.Decoder().decode, (msgspec.DecodeError,))
+
+
+_DECODERS = {"orjson": _orjson_decoder, "msgspec": _msgspec_decoder, "json": _stdlib_decoder}
+
+
+@cache
+def get_decoder() -> JSONDecoder:
+    """
+    Pick the JSON decoder for ESI responses.
+
+    DJANGO_ESI_AUTH_JSON_DECODER selects orjson, msgspec or json, the default "auto" uses the
+    first of orjson and msgspec that is installed and falls back to the standard library.
+
+    Returns:
+        Decoder taking the raw response bytes
+    """
+    choice = getattr(settings, "DJANGO_ESI_AUTH_JSON_DECODER", "auto")
+    if choice != "auto":
+        return _DECODERS[choice]()
+
+    for factory in (_orjson_decoder, _msgspec_decoder):
+        try:
+            return factory()
+        except ImportError:
+            continue
+    return _stdlib_decoder()
@@ -0,0 +1,189 @@
+import json
+import re
+from functools import cache, lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from django.conf import settings
+
+from .exceptions import ESIEndpointError
+
+DEFAULT_SWAGGER_PATH = Path(__file__).parent / "esi_swagger.json"
+
+_PATH_PARAM = re.compile(r"{(\w+)}")
+
+
+class Endpoint:
+    """
+    A single ESI route with its path template compiled once.
+
+    Building a request only walks the precompiled segments, so no per call scanning or
+    str.format of the template is needed.
+    """
+
+    __slots__ = (
+        "method",
+        "path",
+        "operation_id",
+        "path_params",
+        "query_params",
+        "paginated",
+        "public",
+        "scopes",
+        "from_spec",
+        "_segments",
+    )
+
+    def __init__(
+        self,
+        method: str,
+        path: str,
+        operation_id: str = None,
+        query_params: Tuple[str, ...] = (),
+        paginated: bool = False,
+        public: bool = False,
+        scopes: Tuple[str, ...] = (),
+        from_spec: bool = False,
+    ):
+        self.method = method.upper()
+        self.path = path
+        self.operation_id = operation_id
+        self.query_params = frozenset(query_params)
+        self.paginated = paginated
+        self.public = public
+        self.scopes = tuple(scopes)
+        self.from_spec = from_spec
+
+        # Alternating literal and parameter name segments, literals at even indexes
+        self._segments = tuple(_PATH_PARAM.split(path))
+        self.path_params = frozenset(self._segments[1::2])
+
+    def __repr__(self):
+        return f"<Endpoint {self.method} {self.path}>"
+
+    def build_path(self, params: Dict[str, Any]) -> str:
+        """
+        Fill in the path template, removing the path parameters from params
+
+        Args:
+            params: Request keyword arguments
+
+        Returns:
+            Path with all parameters substituted
+        """
+        segments = self._segments
+        if len(segments) == 1:
+            return segments[0]
+
+        parts = []
+        for i, segment in enumerate(segments):
+            if i % 2:
+                try:
+                    parts.append(str(params.pop(segment)))
+                except KeyError:
+                    raise ESIEndpointError(f"Missing path parameter '{segment}' for {self.path}")
+            else:
+                parts.append(segment)
+        return "".join(parts)
+
+    @classmethod
+    def from_operation(cls, method: str, path: str, operation: Dict[str, Any], parameters: Dict[str, Any]):
+        query_params = []
+        paginated = False
+        for parameter in operation.get("parameters", []):
+            if "$ref" in parameter:
+                parameter = parameters[parameter["$ref"].rsplit("/", 1)[-1]]
+            if parameter.get("in") == "query" and parameter["name"] not in ("datasource", "token"):
+                query_params.append(parameter["name"])
+                if parameter["name"] == "page":
+                    paginated = True
+
+        scopes = []
+        for requirement in operation.get("security", []):
+            scopes.extend(requirement.get("evesso", []))
+
+        return cls(
+            method,
+            path,
+            operation_id=operation.get("operationId"),
+            query_params=tuple(query_params),
+            paginated=paginated,
+            public="security" not in operation,
+            scopes=tuple(scopes),
+            from_spec=True,
+        )
+
+
+class EndpointRegistry:
+    """Every route in an ESI swagger spec, looked up by operation ID or by method and path"""
+
+    def __init__(self, endpoints: List[Endpoint] = None):
+        self.by_operation: Dict[str, Endpoint] = {}
+        self.by_route: Dict[Tuple[str, str], Endpoint] = {}
+        for endpoint in endpoints or []:
+            self.add(endpoint)
+
+    def __len__(self):
+        return len(self.by_route)
+
+    def __iter__(self):
+        return iter(self.by_route.values())
+
+    def add(self, endpoint: Endpoint):
+        if endpoint.operation_id:
+            self.by_operation[endpoint.operation_id] = endpoint
+        self.by_route[(endpoint.method, endpoint.path.rstrip("/"))] = endpoint
+
+    def get(self, operation_id: str) -> Endpoint:
+        try:
+            return self.by_operation[operation_id]
+        except KeyError:
+            raise ESIEndpointError(f"Unknown ESI operation '{operation_id}'")
+
+    def lookup(self, method: str, path: str) -> Endpoint | None:
+        return self.by_route.get((method.upper(), path.rstrip("/")))
+
+    @classmethod
+    def from_swagger(cls, spec: Dict[str, Any]) -> "EndpointRegistry":
+        parameters = spec.get("parameters", {})
+        registry = cls()
+        for path, operations in spec.get("paths", {}).items():
+            for method, operation in operations.items():
+                if method == "parameters":
+                    continue
+                registry.add(Endpoint.from_operation(method, path, operation, parameters))
+        return registry
+
+    @classmethod
+    def from_file(cls, path: str | Path) -> "EndpointRegistry":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_swagger(json.load(f))
+
+
+@cache
+def get_registry() -> EndpointRegistry:
+    """
+    Load the endpoint registry on first use, DJANGO_ESI_AUTH_SWAGGER_PATH overrides the vendored spec
+
+    Returns:
+        Registry of every route in the spec
+    """
+    return EndpointRegistry.from_file(getattr(settings, "DJANGO_ESI_AUTH_SWAGGER_PATH", DEFAULT_SWAGGER_PATH))
+
+
+@lru_cache(maxsize=512)
+def get_endpoint(method: str, path: str) -> Endpoint:
+    """
+    Get the compiled endpoint for a route, routes missing from the spec are compiled from the path alone
+
+    Args:
+        method: HTTP method
+        path: Path template, e.g. /characters/{character_id}/
+
+    Returns:
+        Compiled endpoint
+    """
+    endpoint = get_registry().lookup(method, path)
+    if endpoint is None:
+        endpoint = Endpoint(method, path)
+    return endpoint
@@ -20,3 +20,15 @@ class ESIRequestError(Exception):
 
 class ESIResponseDecodeError(Exception):
     pass
+
+
+class ESIEndpointError(Exception):
+    pass
+
+
+class EveTokenRevokedError(Exception):
+    pass
+
+
+class ESICassetteError(Exception):
+    pass
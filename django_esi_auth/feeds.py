@@ -0,0 +1,255 @@
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from typing import Any, Dict, List, NamedTuple
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import signals
+from .batch import BatchExecutor, BatchJob, BatchResult
+from .client import ESIClient, ESIResponse
+from .exceptions import ESIRequestError
+from .models import FeedSubscription, Token
+
+logger = logging.getLogger(__name__)
+
+# Record ID field of the ESIClient methods, registry operations need an explicit id_field
+ID_FIELDS = {
+    "get_character_journal": "id",
+    "get_corporation_journal": "id",
+    "get_character_transactions": "transaction_id",
+    "get_corporation_transactions": "transaction_id",
+    "get_character_contracts": "contract_id",
+    "get_corporation_contracts": "contract_id",
+    "get_character_contract_items": "record_id",
+    "get_corporation_contract_items": "record_id",
+}
+
+
+class FeedChanges(NamedTuple):
+    subscription: FeedSubscription
+    added: List[Dict[str, Any]]
+    changed: List[Dict[str, Any]]
+    removed: List[str]
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+
+def _record_hash(record: Dict[str, Any]) -> str:
+    return hashlib.blake2b(json.dumps(record, sort_keys=True, default=str).encode(), digest_size=8).hexdigest()
+
+
+def _etag(subscription: FeedSubscription, page: int) -> str | None:
+    return subscription.etags[page - 1] if page <= len(subscription.etags) else None
+
+
+def _total_pages(subscription: FeedSubscription, first_page: ESIResponse) -> int:
+    if first_page.status_code != 304:
+        return first_page.total_pages
+    # ESIResponse counts a 304 as one page, ESI still sends the current count, else assume it hasn't changed
+    pages = first_page.headers.get("x-pages")
+    return int(pages) if pages else max(len(subscription.etags), 1)
+
+
+def _page_request(first_page: ESIResponse, page: int, etag: str | None) -> requests.Request:
+    request = first_page.request
+    headers = {key: value for key, value in request.headers.items() if key != "If-None-Match"}
+    if etag:
+        headers["If-None-Match"] = etag
+    return requests.Request(
+        request.method, request.url, headers=headers, params={**request.params, "page": page}, data=request.data
+    )
+
+
+class ChangeFeed:
+    """
+    Polls subscribed endpoints and reports which records were added, changed or removed.
+
+    Each subscription is polled again when the ESI cache behind it expires (the Expires header), not on a
+    fixed interval.  Every page is requested with its last ETag, so unchanged pages cost a 304 and are not
+    downloaded, and records on changed pages are diffed by ID against the hashes stored on the
+    subscription.  Changes are sent with the records_added, records_changed and records_removed signals.
+    The first poll of a subscription reports every record as added, and records on pages that no longer
+    exist are reported as removed.  Subscriptions whose token is quarantined are skipped until the next
+    interval.
+
+    Due subscriptions are leased with SELECT ... FOR UPDATE SKIP LOCKED, so several workers can poll
+    without polling the same subscription twice.
+    """
+
+    def __init__(self, executor: BatchExecutor = None, lease_time: timedelta = timedelta(minutes=5)):
+        self.executor = executor or BatchExecutor()
+        self.lease_time = lease_time
+
+    @property
+    def fallback_interval(self) -> timedelta:
+        """Used when a response has no Expires header or the poll failed"""
+        return timedelta(seconds=getattr(settings, "DJANGO_ESI_AUTH_FEED_INTERVAL", 300))
+
+    @staticmethod
+    def subscribe(endpoint: str, token: Token = None, id_field: str = None, **params: Any) -> FeedSubscription:
+        """
+        Register an endpoint to poll, subscribing twice returns the existing subscription
+
+        Args:
+            endpoint: ESIClient method name or registry operation ID
+            token: Token to call the endpoint with, None for public endpoints
+            id_field: Field identifying a record, known for the ESIClient methods in ID_FIELDS
+            **params: Endpoint parameters, e.g. character_id
+
+        Returns:
+            Subscription, due immediately if it is new
+        """
+        id_field = id_field or ID_FIELDS.get(endpoint)
+        if id_field is None:
+            raise ValueError(f"No known record ID field for {endpoint}, pass id_field")
+
+        subscription, _ = FeedSubscription.objects.get_or_create(
+            token=token, endpoint=endpoint, params=params, defaults={"id_field": id_field}
+        )
+        return subscription
+
+    @staticmethod
+    def unsubscribe(subscription: FeedSubscription):
+        subscription.delete()
+
+    def lease(self, limit: int = 100) -> List[FeedSubscription]:
+        now = timezone.now()
+        with transaction.atomic():
+            subscriptions = list(
+                FeedSubscription.objects.filter(next_poll_at__lte=now)
+                .select_related("token")
+                .order_by("next_poll_at")
+                .select_for_update(skip_locked=True, of=("self",))[:limit]
+            )
+            if subscriptions:
+                FeedSubscription.objects.filter(pk__in=[s.pk for s in subscriptions]).update(
+                    next_poll_at=now + self.lease_time
+                )
+        return subscriptions
+
+    def poll_due(self, limit: int = 100) -> List[FeedChanges]:
+        """
+        Poll the subscriptions whose data has expired, first pages are fetched concurrently
+
+        Args:
+            limit: Most subscriptions to poll in this call
+
+        Returns:
+            Changes of every polled subscription that changed
+        """
+        return self.poll(self.lease(limit))
+
+    def poll(self, subscriptions: List[FeedSubscription]) -> List[FeedChanges]:
+        # A quarantined token would only fail again, try again once a new login or its retry time may have fixed it
+        active = []
+        for subscription in subscriptions:
+            token = subscription.token
+            if token is not None and token.is_quarantined:
+                logger.info(f"Skipping {subscription}, token is {token.status}")
+                self._reschedule(subscription, None, error=f"Token is {token.status}")
+                continue
+            active.append(subscription)
+        subscriptions = active
+
+        jobs = [
+            BatchJob(
+                subscription.endpoint, {**subscription.params, "etag": _etag(subscription, 1)}, subscription.token, i
+            )
+            for i, subscription in enumerate(subscriptions)
+        ]
+
+        results = []
+        for result in self.executor.run(jobs):
+            subscription = subscriptions[result.job.key]
+            try:
+                changes = self._process(subscription, result)
+            except Exception as e:
+                logger.warning(f"Failed to poll {subscription}: {e}")
+                self._reschedule(subscription, None, error=str(e))
+                continue
+            if changes.has_changes:
+                results.append(changes)
+        return results
+
+    def _process(self, subscription: FeedSubscription, result: BatchResult) -> FeedChanges:
+        if not result.ok:
+            raise ESIRequestError(result.error)
+
+        first_page = result.response
+        client = ESIClient(subscription.token, keep_response=False)
+        total_pages = _total_pages(subscription, first_page)
+
+        etags = []
+        pages = []
+        records = {}
+        for page_number in range(1, total_pages + 1):
+            if page_number == 1:
+                page = first_page
+            else:
+                page = client.get_page(_page_request(first_page, page_number, _etag(subscription, page_number)))
+
+            if page.status_code == 304:
+                # Unchanged, keep what we had for this page
+                etags.append(_etag(subscription, page_number))
+                pages.append(subscription.snapshot[page_number - 1])
+                continue
+            if page.status_code == 404 and page_number > 1:
+                # The endpoint has fewer pages than assumed, the records of the missing pages were removed
+                logger.debug(f"{subscription}: page {page_number} of {total_pages} no longer exists")
+                break
+            if page.err:
+                raise ESIRequestError(f"Page {page_number}: {page.err}")
+
+            etags.append(page.etag)
+            hashes = {}
+            for record in page.data:
+                record_id = str(record[subscription.id_field])
+                records[record_id] = record
+                hashes[record_id] = _record_hash(record)
+            pages.append(hashes)
+
+        current = {record_id: h for hashes in pages for record_id, h in hashes.items()}
+        previous = {record_id: h for hashes in subscription.snapshot for record_id, h in hashes.items()}
+        # Records only come from pages that changed, which is where any new or different record is
+        changes = FeedChanges(
+            subscription,
+            added=[records[i] for i in current.keys() - previous.keys()],
+            changed=[records[i] for i, h in current.items() if i in previous and previous[i] != h],
+            removed=list(previous.keys() - current.keys()),
+        )
+
+        subscription.etags = etags
+        subscription.snapshot = pages
+        # A receiver that raises rolls the snapshot back, so the changes are reported again on the next poll
+        with transaction.atomic():
+            self._reschedule(subscription, first_page, fields=["etags", "snapshot"])
+            self._dispatch(changes)
+        return changes
+
+    def _reschedule(self, subscription: FeedSubscription, response, error: str = None, fields: List[str] = None):
+        now = timezone.now()
+        expires = response.expires if response is not None else None
+        subscription.next_poll_at = expires if expires is not None and expires > now else now + self.fallback_interval
+        subscription.polled_at = now
+        subscription.last_error = error
+        subscription.save(update_fields=["next_poll_at", "polled_at", "last_error", *(fields or [])])
+
+    def _dispatch(self, changes: FeedChanges):
+        subscription = changes.subscription
+        if changes.added:
+            signals.records_added.send(sender=self.__class__, subscription=subscription, records=changes.added)
+        if changes.changed:
+            signals.records_changed.send(sender=self.__class__, subscription=subscription, records=changes.changed)
+        if changes.removed:
+            signals.records_removed.send(sender=self.__class__, subscription=subscription, record_ids=changes.removed)
+        logger.debug(
+            f"{subscription}: {len(changes.added)} added, {len(changes.changed)} changed, "
+            f"{len(changes.removed)} removed"
+        )
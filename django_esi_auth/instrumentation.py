@@ -0,0 +1,189 @@
+import re
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, List, Tuple
+
+from . import signals
+
+DEFAULT_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def endpoint_label(url: str) -> str:
+    """
+    Reduce a full ESI request URL to a low cardinality label
+
+    Args:
+        url: Request URL, with or without query string
+
+    Returns:
+        Path with numeric segments replaced, e.g. /characters/{id}/wallet/journal/
+    """
+    path = url.split("?", 1)[0]
+    if "://" in path:
+        path = "/" + path.split("://", 1)[1].split("/", 1)[-1]
+    return _ID_SEGMENT.sub("/{id}", path)
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsCollector:
+    """
+    In-process collector for ESI request metrics.
+
+    Listens to the django_esi_auth signals and keeps counters, gauges and histograms keyed by
+    metric name and labels.  Read back with snapshot() or export_prometheus().
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._gauges: Dict[Tuple[str, Tuple], float] = {}
+        self._histograms: Dict[Tuple[str, Tuple], List] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, Any]) -> Tuple[str, Tuple]:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                # Bucket counts, then sum and count
+                histogram = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            histogram[0][bisect_left(self.buckets, value)] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Returns:
+            Copy of all metrics as plain Python structures
+        """
+        with self._lock:
+            counters = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in self._counters.items()]
+            gauges = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in self._gauges.items()]
+            histograms = [
+                {
+                    "name": n,
+                    "labels": dict(l),
+                    "buckets": dict(zip(self.buckets + (float("inf"),), list(h[0]))),
+                    "sum": h[1],
+                    "count": h[2],
+                }
+                for (n, l), h in self._histograms.items()
+            ]
+        return {"counters": counters, "gauges": gauges, "histograms": histograms}
+
+    def export_prometheus(self) -> str:
+        """
+        Returns:
+            All metrics in the Prometheus text exposition format
+        """
+
+        def fmt_labels(labels: Dict[str, Any]) -> str:
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels.items()) + "}"
+
+        snapshot = self.snapshot()
+        lines = []
+        seen = set()
+
+        for kind in ("counters", "gauges"):
+            for metric in sorted(snapshot[kind], key=lambda m: m["name"]):
+                if metric["name"] not in seen:
+                    seen.add(metric["name"])
+                    lines.append(f"# TYPE {metric['name']} {'counter' if kind == 'counters' else 'gauge'}")
+                lines.append(f"{metric['name']}{fmt_labels(metric['labels'])} {metric['value']}")
+
+        for metric in sorted(snapshot["histograms"], key=lambda m: m["name"]):
+            name = metric["name"]
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, count in metric["buckets"].items():
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{fmt_labels({**metric['labels'], 'le': le})} {cumulative}")
+            lines.append(f"{name}_sum{fmt_labels(metric['labels'])} {metric['sum']}")
+            lines.append(f"{name}_count{fmt_labels(metric['labels'])} {metric['count']}")
+
+        return "\n".join(lines) + "\n"
+
+    def connect(self):
+        signals.esi_request_finished.connect(self._on_request_finished, dispatch_uid=f"esi-metrics-{id(self)}")
+        signals.esi_pages_fetched.connect(self._on_pages_fetched, dispatch_uid=f"esi-metrics-pages-{id(self)}")
+        signals.token_refreshed.connect(self._on_token_refreshed, dispatch_uid=f"esi-metrics-refresh-{id(self)}")
+        signals.sso_callback_profiled.connect(self._on_callback_profiled, dispatch_uid=f"esi-metrics-sso-{id(self)}")
+
+    def disconnect(self):
+        signals.esi_request_finished.disconnect(dispatch_uid=f"esi-metrics-{id(self)}")
+        signals.esi_pages_fetched.disconnect(dispatch_uid=f"esi-metrics-pages-{id(self)}")
+        signals.token_refreshed.disconnect(dispatch_uid=f"esi-metrics-refresh-{id(self)}")
+        signals.sso_callback_profiled.disconnect(dispatch_uid=f"esi-metrics-sso-{id(self)}")
+
+    def _on_request_finished(
+        self,
+        sender,
+        method: str,
+        endpoint: str,
+        status_code: int | None,
+        elapsed: float,
+        retries: int,
+        response_bytes: int,
+        error_limit_remain: int | None,
+        **kwargs,
+    ):
+        labels = {"method": method, "endpoint": endpoint}
+        self.inc("esi_requests_total", **labels, status=status_code or "error")
+        self.observe("esi_request_duration_seconds", elapsed, **labels)
+        if retries:
+            self.inc("esi_request_retries_total", retries, **labels)
+        if status_code == 304:
+            self.inc("esi_not_modified_total", **labels)
+        if response_bytes:
+            self.inc("esi_response_bytes_total", response_bytes, **labels)
+        if error_limit_remain is not None:
+            self.set_gauge("esi_error_limit_remain", error_limit_remain)
+
+    def _on_pages_fetched(self, sender, endpoint: str, pages: int, elapsed: float, **kwargs):
+        self.inc("esi_pages_total", pages, endpoint=endpoint)
+        self.observe("esi_paginated_duration_seconds", elapsed, endpoint=endpoint)
+
+    def _on_token_refreshed(self, sender, elapsed: float, success: bool, **kwargs):
+        self.inc("esi_token_refresh_total", success=str(success).lower())
+        self.observe("esi_token_refresh_duration_seconds", elapsed)
+
+    def _on_callback_profiled(self, sender, profile: dict, **kwargs):
+        self.inc("esi_sso_callback_total", outcome=profile["outcome"])
+        self.observe("esi_sso_callback_duration_seconds", profile["total_ms"] / 1000)
+        self.inc("esi_sso_callback_queries_total", profile["total_queries"])
+        for stage in profile["stages"]:
+            self.observe("esi_sso_callback_stage_duration_seconds", stage["ms"] / 1000, stage=stage["stage"])
+            self.inc("esi_sso_callback_stage_queries_total", stage["queries"], stage=stage["stage"])
+
+
+collector = MetricsCollector()
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_esi_auth", "0005_alter_eveentity_eve_entity_id"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SyncCursor",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "owner_type",
+                    models.CharField(
+                        choices=[
+                            ("character", "Character"),
+                            ("corporation", "Corporation"),
+                            ("alliance", "Alliance"),
+                            ("station", "Station"),
+                            ("structure", "Structure"),
+                            ("unknown", "Unknown"),
+                        ]
+                    ),
+                ),
+                ("owner_id", models.BigIntegerField()),
+                ("endpoint", models.CharField(max_length=100)),
+                ("last_id", models.BigIntegerField(default=0)),
+                ("etag", models.CharField(blank=True, max_length=255, null=True)),
+                ("synced_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(fields=("owner_type", "owner_id", "endpoint"), name="unique_sync_cursor")
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_esi_auth", "0006_synccursor"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="token",
+            name="version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
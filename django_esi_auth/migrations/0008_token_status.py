@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_esi_auth", "0007_token_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="token",
+            name="failure_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="token",
+            name="last_error",
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="token",
+            name="last_failure_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="token",
+            name="status",
+            field=models.CharField(
+                choices=[("valid", "Valid"), ("failing", "Failing"), ("revoked", "Revoked")],
+                db_index=True,
+                default="valid",
+            ),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_esi_auth", "0008_token_status"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="eveentity",
+            name="eve_entity_id",
+            field=models.BigIntegerField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name="eveentity",
+            name="eve_entity_name",
+            field=models.CharField(db_index=True, default="Unknown"),
+        ),
+        migrations.AlterField(
+            model_name="eveuser",
+            name="character_id",
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="eveuser",
+            name="character_name",
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name="token",
+            name="character_id",
+            field=models.CharField(db_index=True, max_length=50),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_esi_auth", "0009_admin_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="eveentity",
+            name="leased_until",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="eveentity",
+            name="resolve_after",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="eveentity",
+            name="resolve_attempts",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="eveentity",
+            index=models.Index(
+                fields=["eve_entity_name", "resolve_attempts", "resolve_after"], name="esi_entity_resolve_idx"
+            ),
+        ),
+    ]
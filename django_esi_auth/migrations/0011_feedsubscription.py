@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_esi_auth", "0010_entity_resolution_queue"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FeedSubscription",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("endpoint", models.CharField(max_length=100)),
+                ("params", models.JSONField(default=dict)),
+                ("id_field", models.CharField(max_length=50)),
+                ("etags", models.JSONField(default=list)),
+                ("snapshot", models.JSONField(default=list)),
+                ("next_poll_at", models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ("polled_at", models.DateTimeField(blank=True, null=True)),
+                ("last_error", models.TextField(blank=True, null=True)),
+                (
+                    "token",
+                    models.ForeignKey(
+                        blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to="django_esi_auth.token"
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_esi_auth", "0011_feedsubscription"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="token",
+            name="character_name",
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+    ]
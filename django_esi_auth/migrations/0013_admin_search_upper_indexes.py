@@ -0,0 +1,41 @@
+from django.db import migrations
+
+# Admin search matches these columns with istartswith, which PostgreSQL runs as UPPER(column::text) LIKE 'TERM%'.
+# A plain UPPER() index only serves LIKE under the C collation, text_pattern_ops serves it under any collation.
+# Other backends don't wrap the column in UPPER() (MySQL) or can't index LIKE this way (SQLite), so it's skipped.
+INDEXES = [
+    ("eveentity", "eve_entity_name", "esi_eveentity_name_upper_like"),
+    ("eveuser", "character_name", "esi_eveuser_name_upper_like"),
+    ("eveuser", "username", "esi_eveuser_username_upper_like"),
+    ("token", "character_name", "esi_token_name_upper_like"),
+]
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    quote = schema_editor.quote_name
+    for model_name, column, index_name in INDEXES:
+        table = apps.get_model("django_esi_auth", model_name)._meta.db_table
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {quote(index_name)} ON {quote(table)} "
+            f"(UPPER({quote(column)}::text) text_pattern_ops)"
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for _, _, index_name in INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {schema_editor.quote_name(index_name)}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_esi_auth", "0012_token_character_name_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:41
+
+import json
+
+from django.db import migrations, models
+
+IDENTITY = ["character_id", "character_owner_hash", "scopes"]
+
+
+def merge_duplicate_tokens(apps, schema_editor):
+    """Keep the newest token of each identity, moving feed subscriptions the kept token doesn't have yet"""
+    Token = apps.get_model("django_esi_auth", "Token")
+    FeedSubscription = apps.get_model("django_esi_auth", "FeedSubscription")
+
+    duplicates = Token.objects.values(*IDENTITY).annotate(count=models.Count("pk")).filter(count__gt=1)
+    for identity in duplicates:
+        del identity["count"]
+        kept, *others = Token.objects.filter(**identity).order_by("-expires_at", "-pk")
+        existing = {
+            (endpoint, json.dumps(params, sort_keys=True))
+            for endpoint, params in FeedSubscription.objects.filter(token=kept).values_list("endpoint", "params")
+        }
+        for subscription in FeedSubscription.objects.filter(token__in=others):
+            key = (subscription.endpoint, json.dumps(subscription.params, sort_keys=True))
+            if key not in existing:
+                existing.add(key)
+                subscription.token = kept
+                subscription.save(update_fields=["token"])
+        Token.objects.filter(pk__in=[token.pk for token in others]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("django_esi_auth", "0013_admin_search_upper_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_tokens, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="token",
+            constraint=models.UniqueConstraint(
+                fields=("character_id", "character_owner_hash", "scopes"), name="unique_token_identity"
+            ),
+        ),
+    ]
@@ -1,11 +1,14 @@
 import base64
 import datetime
 import json
+import logging
 from importlib import import_module
-from typing import Dict, Any, Union, List
+from time import perf_counter
+from typing import Dict, Any, Iterable, Union, List, Tuple
 
 import pytz
 import requests
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
@@ -13,13 +16,18 @@ from django.utils import timezone
 from jwcrypto.jwk import JWKSet
 from jwcrypto.jwt import JWT
 
-from . import signals
-from .choices import EveEntityTypeEnum
+from . import async_http, signals, token_store
+from .choices import EveEntityTypeEnum, TokenStatusEnum
+from .exceptions import EveTokenRevokedError
+from .profiling import profile_stage
+from .utils import sso_url
+
+logger = logging.getLogger(__name__)
 
 
 class EveUser(AbstractUser):
-    character_id = models.IntegerField(blank=True, null=True)
-    character_name = models.CharField(max_length=255, blank=True, null=True)
+    character_id = models.IntegerField(blank=True, null=True, db_index=True)
+    character_name = models.CharField(max_length=255, blank=True, null=True, db_index=True)
     character_owner_hash = models.CharField(max_length=255, blank=True, null=True)
     corporation_id = models.IntegerField(blank=True, null=True)
     alliance_id = models.IntegerField(blank=True, null=True)
@@ -31,21 +39,43 @@ class EveUser(AbstractUser):
 
 class EveEntityManager(models.Manager):
 
-    def get_unknown_searchable_ids(self) -> List[int]:
+    def _unknowns(self, entity_ids: Iterable[int] = None) -> models.QuerySet:
+        queryset = self.filter(eve_entity_name="Unknown").exclude(eve_entity_id=0)
+        if entity_ids is not None:
+            queryset = queryset.filter(eve_entity_id__in=entity_ids)
+        return queryset
+
+    def get_unknown_searchable_ids(self, entity_ids: Iterable[int] = None) -> List[int]:
         return list(
-            self.filter(eve_entity_name="Unknown")
+            self._unknowns(entity_ids)
             .exclude(eve_entity_type=EveEntityTypeEnum.STRUCTURE)
-            .exclude(eve_entity_id=0)
             .values_list("eve_entity_id", flat=True)
         )
 
-    def get_uknown_structure_ids(self) -> List[int]:
+    def get_uknown_structure_ids(self, entity_ids: Iterable[int] = None) -> List[int]:
         return list(
-            self.filter(eve_entity_name="Unknown", eve_entity_type=EveEntityTypeEnum.STRUCTURE)
-            .exclude(eve_entity_id=0)
+            self._unknowns(entity_ids)
+            .filter(eve_entity_type=EveEntityTypeEnum.STRUCTURE)
             .values_list("eve_entity_id", flat=True)
         )
 
+    def resolution_queue(self, now: datetime.datetime = None) -> models.QuerySet:
+        """
+        Args:
+            now: Time to check backoff and leases against, defaults to now
+
+        Returns:
+            Unknown entities due for resolution and not leased by a worker, in priority order: never tried
+            first, then the ones whose backoff ran out longest ago
+        """
+        now = now or timezone.now()
+        return (
+            self._unknowns()
+            .filter(models.Q(resolve_after__isnull=True) | models.Q(resolve_after__lte=now))
+            .filter(models.Q(leased_until__isnull=True) | models.Q(leased_until__lte=now))
+            .order_by("resolve_attempts", models.F("resolve_after").asc(nulls_first=True), "pk")
+        )
+
     def update_entities_from_esi(self, esi_data) -> List["EveEntity"]:
         entities_by_id = {e["id"]: e for e in esi_data}
         instances_to_update = []
@@ -58,6 +88,16 @@ class EveEntityManager(models.Manager):
         self.bulk_update(instances_to_update, ["eve_entity_name", "eve_entity_type"])
         return instances_to_update
 
+    def update_structures_from_esi(self, structures: Dict[int, Dict[str, Any]]) -> List["EveEntity"]:
+        instances_to_update = []
+
+        for entity in self.filter(eve_entity_id__in=structures.keys(), eve_entity_type=EveEntityTypeEnum.STRUCTURE):
+            entity.eve_entity_name = structures[entity.eve_entity_id]["name"]
+            instances_to_update.append(entity)
+
+        self.bulk_update(instances_to_update, ["eve_entity_name"])
+        return instances_to_update
+
     def update_entity_name(self, id: int, name: str) -> "EveEntity":
         try:
             entity = self.get(eve_entity_id=id)
@@ -68,38 +108,44 @@ class EveEntityManager(models.Manager):
 
         return entity
 
-    def update_unknowns(self, tokens: List["Token"]) -> List["EveEntity"]:
+    def update_unknowns(self, tokens: List["Token"], entity_ids: Iterable[int] = None) -> List["EveEntity"]:
+        """
+        Resolve the names of Unknown entities, structures are resolved with the tokens
+
+        Args:
+            tokens: Tokens to resolve structures with
+            entity_ids: Limit to these entity IDs, every Unknown entity if not given
+
+        Returns:
+            Updated entities
+        """
         results = []
-        unknown_searchable_ids = self.get_unknown_searchable_ids()
+        unknown_searchable_ids = self.get_unknown_searchable_ids(entity_ids)
 
         public_client = getattr(import_module("django_esi_auth.client"), "ESIClient")()
         for i in range(0, len(unknown_searchable_ids), 999):
             batch = unknown_searchable_ids[i : i + 999]
             response = public_client.get_names(batch)
             results.extend(self.update_entities_from_esi(response.data))
-        found = []
-        if tokens:
-            for token in tokens:
-                structure_ids = self.get_uknown_structure_ids()
-                if structure_ids:
-                    client = getattr(import_module("django_esi_auth.client"), "ESIClient")(token)
-                    for structure_id in structure_ids:
-                        if structure_id not in found:
-                            response = client.get_structure(structure_id=structure_id)
-                            if not response.err and response.data:
-                                results.append(self.update_entity_name(structure_id, response.data["name"]))
-                                found.append(structure_id)
+        structure_ids = self.get_uknown_structure_ids(entity_ids)
+        if tokens and structure_ids:
+            resolver = getattr(import_module("django_esi_auth.structures"), "StructureResolver")(tokens)
+            structures = resolver.resolve(structure_ids)
+            results.extend(self.update_structures_from_esi(structures))
         return results
 
 
 class EveEntity(models.Model):
-    eve_entity_id = models.BigIntegerField()
+    eve_entity_id = models.BigIntegerField(db_index=True)
     eve_entity_type = models.CharField(
         null=False,
         blank=False,
         choices=EveEntityTypeEnum.choices,
     )
-    eve_entity_name = models.CharField(null=False, blank=False, default="Unknown")
+    eve_entity_name = models.CharField(null=False, blank=False, default="Unknown", db_index=True)
+    resolve_attempts = models.PositiveIntegerField(default=0)
+    resolve_after = models.DateTimeField(blank=True, null=True)
+    leased_until = models.DateTimeField(blank=True, null=True)
 
     objects = EveEntityManager()
 
@@ -108,6 +154,11 @@ class EveEntity(models.Model):
 
     class Meta:
         verbose_name_plural = "Eve Entities"
+        indexes = [
+            models.Index(
+                fields=["eve_entity_name", "resolve_attempts", "resolve_after"], name="esi_entity_resolve_idx"
+            ),
+        ]
 
 
 class LoginAccessRight(models.Model):
@@ -119,13 +170,46 @@ class LoginAccessRight(models.Model):
 
 class TokenManager(models.Manager):
 
+    @staticmethod
+    def max_failures() -> int:
+        return getattr(settings, "DJANGO_ESI_AUTH_TOKEN_MAX_FAILURES", 5)
+
+    @staticmethod
+    def retry_after() -> datetime.timedelta:
+        return datetime.timedelta(seconds=getattr(settings, "DJANGO_ESI_AUTH_TOKEN_RETRY_AFTER", 60 * 60))
+
+    def usable(self) -> models.QuerySet:
+        """
+        Returns:
+            Tokens that are not quarantined, see Token.is_quarantined
+        """
+        return self.exclude(status=TokenStatusEnum.REVOKED).exclude(
+            status=TokenStatusEnum.FAILING,
+            failure_count__gte=self.max_failures(),
+            last_failure_at__gt=timezone.now() - self.retry_after(),
+        )
+
     def get_token(self, scope, character_id) -> Union["Token", None]:
+        if token_store.enabled():
+            token = token_store.get_indexed(self.model, character_id, scope)
+            if token is not None and not token.is_quarantined:
+                return token
+
         try:
-            return self.filter(scopes__contains=scope, character_id=character_id).first()
+            token = self.usable().filter(scopes__contains=scope, character_id=character_id).first()
         except Token.DoesNotExist:
             return None
 
-    def save_sso_response(self, token_response: Dict[str, Any]):
+        if token is not None and token_store.enabled():
+            token_store.put_indexed(token, character_id, scope)
+        return token
+
+    @staticmethod
+    def _sso_response_fields(token_response: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Returns:
+            Lookup identifying the token and the values to write to it
+        """
         claims = token_response["claims"]
         character_id = claims["sub"].split(":")[-1]
         character_name = claims["name"]
@@ -135,36 +219,93 @@ class TokenManager(models.Manager):
         if not isinstance(claims["scp"], str):
             scopes = " ".join(claims["scp"])
 
-        try:
-            token = self.get(scopes=scopes, character_id=character_id, character_owner_hash=owner_hash)
-        except Token.DoesNotExist:
-            token = Token(
-                scopes=scopes, character_id=character_id, character_name=character_name, character_owner_hash=owner_hash
-            )
-            signals.token_created.send(sender=self.__class__, token=token)
+        expires_at = datetime.datetime.fromtimestamp(claims["exp"])
+        lookup = {"scopes": scopes, "character_id": character_id, "character_owner_hash": owner_hash}
+        values = {
+            "access_token_backup": token_response["access_token"],
+            "refresh_token": token_response["refresh_token"],
+            "expires_at": timezone.make_aware(expires_at, pytz.utc),
+            "character_name": character_name,
+            # Logging in again brings a quarantined token back
+            "status": TokenStatusEnum.VALID,
+            "failure_count": 0,
+            "last_error": None,
+        }
+        return lookup, values
 
-        token.access_token_backup = token_response["access_token"]
-        token.refresh_token = token_response["refresh_token"]
+    @staticmethod
+    def _upsert_options(lookup: Dict[str, Any], values: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        bulk_create options inserting a token, or updating it if a concurrent login inserted it first
+        """
+        return {"update_conflicts": True, "unique_fields": list(lookup), "update_fields": list(values)}
 
-        expires_at = datetime.datetime.fromtimestamp(claims["exp"])
-        token.expires_at = timezone.make_aware(expires_at, pytz.utc)
+    def save_sso_response(self, token_response: Dict[str, Any]):
+        lookup, values = self._sso_response_fields(token_response)
+
+        # An existing token is updated in a single statement without loading it first
+        updated = self.filter(**lookup).update(version=models.F("version") + 1, **values)
+        if updated:
+            if token_store.enabled():
+                # Replace the cached copy, it still holds the old tokens, status and version
+                token_store.put(self.get(**lookup))
+            return
+
+        token = Token(**lookup, **values)
+        signals.token_created.send(sender=self.__class__, token=token)
+        # INSERT ... ON CONFLICT on unique_token_identity, two first logins of a character end up in one row
+        self.bulk_create([token], **self._upsert_options(lookup, values))
+
+        if token_store.enabled():
+            token_store.put(token if token.pk is not None else self.get(**lookup))
+
+    async def asave_sso_response(self, token_response: Dict[str, Any]):
+        """
+        Async version of save_sso_response
+        """
+        lookup, values = self._sso_response_fields(token_response)
+
+        updated = await self.filter(**lookup).aupdate(version=models.F("version") + 1, **values)
+        if updated:
+            if token_store.enabled():
+                await sync_to_async(token_store.put)(await self.aget(**lookup))
+            return
 
-        token.save()
+        token = Token(**lookup, **values)
+        # Receivers are written for the sync path
+        await sync_to_async(signals.token_created.send)(sender=self.__class__, token=token)
+        await self.abulk_create([token], **self._upsert_options(lookup, values))
+
+        if token_store.enabled():
+            await sync_to_async(token_store.put)(token if token.pk is not None else await self.aget(**lookup))
 
     @staticmethod
     def get_jwks() -> JWKSet:
         # TODO: Change to use the REDIS cache witha Timeout
-        response = requests.get("https://login.eveonline.com/.well-known/oauth-authorization-server", timeout=10)
-        metadata = response.json()
-        response = requests.get(metadata["jwks_uri"], timeout=10)
+        with profile_stage("jwks"):
+            response = requests.get(sso_url("/.well-known/oauth-authorization-server"), timeout=10)
+            metadata = response.json()
+            response = requests.get(metadata["jwks_uri"], timeout=10)
 
-        jwks = JWKSet()
-        jwks.import_keyset(response.text)
+            jwks = JWKSet()
+            jwks.import_keyset(response.text)
 
         return jwks
 
     @staticmethod
-    def request_access_token_from_auth_code(authorization_code: str) -> Dict[str, Any]:
+    async def aget_jwks() -> JWKSet:
+        with profile_stage("jwks"):
+            response = await async_http.get(sso_url("/.well-known/oauth-authorization-server"))
+            metadata = response.json()
+            response = await async_http.get(metadata["jwks_uri"])
+
+            jwks = JWKSet()
+            jwks.import_keyset(response.text)
+
+        return jwks
+
+    @staticmethod
+    def _auth_code_request(authorization_code: str) -> Dict[str, Any]:
         basic_auth = base64.urlsafe_b64encode(
             f"{settings.ESI_SSO_CLIENT_ID}:{settings.ESI_SSO_CLIENT_SECRET}".encode("utf-8")
         ).decode()
@@ -176,12 +317,11 @@ class TokenManager(models.Manager):
 
         data = {"grant_type": "authorization_code", "code": authorization_code}
 
-        response = requests.post("https://login.eveonline.com/v2/oauth/token", headers=headers, data=data)
-
-        response.raise_for_status()
+        return {"headers": headers, "data": data}
 
-        token_response = response.json()
-        jwt = JWT(jwt=token_response["access_token"], key=TokenManager.get_jwks())
+    @staticmethod
+    def _decode_token_response(token_response: Dict[str, Any], jwks: JWKSet) -> Dict[str, Any]:
+        jwt = JWT(jwt=token_response["access_token"], key=jwks)
 
         claims = json.loads(jwt.claims)
         token_response["claims"] = claims
@@ -193,15 +333,56 @@ class TokenManager(models.Manager):
 
         return token_response
 
+    @staticmethod
+    def request_access_token_from_auth_code(authorization_code: str) -> Dict[str, Any]:
+        with profile_stage("token_request"):
+            response = requests.post(sso_url("/v2/oauth/token"), **TokenManager._auth_code_request(authorization_code))
+
+        response.raise_for_status()
+
+        return TokenManager._decode_token_response(response.json(), TokenManager.get_jwks())
+
+    @staticmethod
+    async def arequest_access_token_from_auth_code(authorization_code: str) -> Dict[str, Any]:
+        """
+        Async version of request_access_token_from_auth_code, the SSO calls don't block the event loop
+        """
+        with profile_stage("token_request"):
+            response = await async_http.post(
+                sso_url("/v2/oauth/token"), **TokenManager._auth_code_request(authorization_code)
+            )
+
+        response.raise_for_status()
+
+        return TokenManager._decode_token_response(response.json(), await TokenManager.aget_jwks())
+
+
+# Fields another worker or a login may have changed under an instance
+RELOADED_FIELDS = [
+    "access_token_backup",
+    "refresh_token",
+    "expires_at",
+    "version",
+    "status",
+    "failure_count",
+    "last_error",
+    "last_failure_at",
+]
+
 
 class Token(models.Model):
     access_token_backup = models.TextField()
     refresh_token = models.CharField(max_length=200, blank=True, null=True)
     expires_at = models.DateTimeField()
     scopes = models.TextField(blank=True, null=True)
-    character_id = models.CharField(max_length=50)
-    character_name = models.CharField(max_length=255)
+    character_id = models.CharField(max_length=50, db_index=True)
+    character_name = models.CharField(max_length=255, db_index=True)
     character_owner_hash = models.CharField(max_length=100)
+    version = models.PositiveIntegerField(default=0)
+    status = models.CharField(choices=TokenStatusEnum.choices, default=TokenStatusEnum.VALID, db_index=True)
+    failure_count = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, null=True)
+    last_failure_at = models.DateTimeField(blank=True, null=True)
 
     objects = TokenManager()
 
@@ -215,14 +396,62 @@ class Token(models.Model):
             str: Access Token
         """
         if timezone.now() > self.expires_at:
-            self.refresh()
+            if not self._load_cached():
+                self.refresh()
 
         return self.access_token_backup
 
+    def _load_cached(self) -> bool:
+        """
+        Adopt a newer access token cached by another worker, if there is one
+
+        Returns:
+            bool: True if the cached access token is still valid
+        """
+        if not token_store.enabled() or self.pk is None:
+            return False
+
+        cached = token_store.get(self.__class__, self.pk)
+        if cached is None or timezone.now() > cached.expires_at:
+            return False
+
+        self.access_token_backup = cached.access_token_backup
+        self.refresh_token = cached.refresh_token
+        self.expires_at = cached.expires_at
+        self.version = cached.version
+        return True
+
     def refresh(self):
         """
         Refreshes the access token and updates the Token object
         """
+        if self.status == TokenStatusEnum.REVOKED:
+            raise EveTokenRevokedError(f"Token for {self.character_name} has been revoked: {self.last_error}")
+
+        started = perf_counter()
+        success = False
+        try:
+            self._refresh()
+            success = True
+        except requests.HTTPError as e:
+            if self._is_invalid_grant(e.response):
+                if self._mark_revoked(e.response.text):
+                    raise EveTokenRevokedError(f"Token for {self.character_name} has been revoked: {e}") from e
+                # Our refresh token was stale, the stored one replaced it
+                if timezone.now() > self.expires_at:
+                    self.refresh()
+                return
+            if self._mark_failing(str(e)) or timezone.now() > self.expires_at:
+                raise
+        except requests.RequestException as e:
+            if self._mark_failing(str(e)) or timezone.now() > self.expires_at:
+                raise
+        finally:
+            signals.token_refreshed.send(
+                sender=self.__class__, token=self, elapsed=perf_counter() - started, success=success
+            )
+
+    def _refresh(self):
         basic_auth = base64.urlsafe_b64encode(
             f"{settings.ESI_SSO_CLIENT_ID}:{settings.ESI_SSO_CLIENT_SECRET}".encode("utf-8")
         ).decode()
@@ -234,7 +463,7 @@ class Token(models.Model):
 
         data = {"grant_type": "refresh_token", "refresh_token": self.refresh_token}
 
-        response = requests.post("https://login.eveonline.com/v2/oauth/token", headers=headers, data=data)
+        response = requests.post(sso_url("/v2/oauth/token"), headers=headers, data=data)
 
         response.raise_for_status()
 
@@ -243,11 +472,152 @@ class Token(models.Model):
 
         claims = json.loads(jwt.claims)
 
-        self.access_token_backup = token_response["access_token"]
+        expires_at = datetime.datetime.fromtimestamp(claims["exp"])
+        values = {
+            "access_token_backup": token_response["access_token"],
+            "expires_at": timezone.make_aware(expires_at, pytz.utc),
+        }
+        # Only write the refresh token when SSO rotated it
         if self.refresh_token != token_response["refresh_token"]:
-            self.refresh_token = token_response["refresh_token"]
+            values["refresh_token"] = token_response["refresh_token"]
+        if self.status != TokenStatusEnum.VALID or self.failure_count:
+            values.update(status=TokenStatusEnum.VALID, failure_count=0, last_error=None)
 
-        expires_at = datetime.datetime.fromtimestamp(claims["exp"])
-        self.expires_at = timezone.make_aware(expires_at, pytz.utc)
+        self._write_refresh(values)
+
+        if token_store.enabled():
+            token_store.put(self)
+
+    @staticmethod
+    def _is_invalid_grant(response: requests.Response | None) -> bool:
+        if response is None or response.status_code not in (400, 401):
+            return False
+        try:
+            return response.json().get("error") == "invalid_grant"
+        except ValueError:
+            return False
+
+    def _mark_failed(self, status: TokenStatusEnum, error: str) -> bool:
+        """
+        Record a failed refresh, unless the row was refreshed or logged in again since it was loaded
+
+        Returns:
+            bool: False if the row had moved on, the instance then holds the stored token instead
+        """
+        last_failure_at = timezone.now()
+        updated = self.__class__.objects.filter(pk=self.pk, version=self.version).update(
+            status=status,
+            failure_count=models.F("failure_count") + 1,
+            last_error=error,
+            last_failure_at=last_failure_at,
+        )
+
+        if not updated:
+            logger.info(f"Refresh failed for {self.character_name} with a stale token, using the stored token")
+            self._reload()
+            return False
+
+        self.status = status
+        self.failure_count += 1
+        self.last_error = error
+        self.last_failure_at = last_failure_at
+        logger.warning(f"Refresh failed for {self.character_name} ({self.failure_count} failures): {error}")
+        return True
+
+    def _mark_failing(self, error: str) -> bool:
+        return self._mark_failed(TokenStatusEnum.FAILING, error)
+
+    def _mark_revoked(self, error: str) -> bool:
+        if not self._mark_failed(TokenStatusEnum.REVOKED, error):
+            return False
+
+        if token_store.enabled():
+            token_store.delete(self.pk)
+        signals.token_revoked.send(sender=self.__class__, token=self)
+        return True
+
+    @property
+    def is_quarantined(self) -> bool:
+        """
+        Revoked tokens should be skipped, and so should tokens that failed DJANGO_ESI_AUTH_TOKEN_MAX_FAILURES
+        refreshes in a row until DJANGO_ESI_AUTH_TOKEN_RETRY_AFTER has passed since the last failure
+        """
+        if self.status == TokenStatusEnum.REVOKED:
+            return True
+        return (
+            self.status == TokenStatusEnum.FAILING
+            and self.failure_count >= TokenManager.max_failures()
+            and self.last_failure_at is not None
+            and self.last_failure_at > timezone.now() - TokenManager.retry_after()
+        )
+
+    def _write_refresh(self, values: Dict[str, Any]) -> bool:
+        """
+        Write refreshed fields, unless another worker refreshed the row since it was loaded
+
+        Args:
+            values: Changed fields
+
+        Returns:
+            bool: False if another refresh won, the instance then holds that refresh's token instead
+        """
+        updated = self.__class__.objects.filter(pk=self.pk, version=self.version).update(
+            version=models.F("version") + 1, **values
+        )
+
+        if not updated:
+            logger.info(f"Token for {self.character_name} was refreshed concurrently, using the stored token")
+            self._reload()
+            return False
+
+        for field, value in values.items():
+            setattr(self, field, value)
+        self.version += 1
+        return True
+
+    def _reload(self):
+        self.refresh_from_db(fields=RELOADED_FIELDS)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["character_id", "character_owner_hash", "scopes"], name="unique_token_identity"
+            ),
+        ]
+
+
+class SyncCursor(models.Model):
+    """Highest row ID and last ETag seen for one incrementally synced endpoint of a character or corporation"""
+
+    owner_type = models.CharField(choices=EveEntityTypeEnum.choices)
+    owner_id = models.BigIntegerField()
+    endpoint = models.CharField(max_length=100)
+    last_id = models.BigIntegerField(default=0)
+    etag = models.CharField(max_length=255, blank=True, null=True)
+    synced_at = models.DateTimeField(blank=True, null=True)
 
-        self.save()
+    def __str__(self):
+        return f"{self.owner_type} {self.owner_id} {self.endpoint}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner_type", "owner_id", "endpoint"], name="unique_sync_cursor"),
+        ]
+
+
+class FeedSubscription(models.Model):
+    """An endpoint polled for changed records on behalf of a token, see django_esi_auth.feeds"""
+
+    token = models.ForeignKey(Token, models.CASCADE, blank=True, null=True)
+    endpoint = models.CharField(max_length=100)
+    params = models.JSONField(default=dict)
+    id_field = models.CharField(max_length=50)
+    # ETag of each page and, for each page, record ID -> hash of the record as last seen
+    etags = models.JSONField(default=list)
+    snapshot = models.JSONField(default=list)
+    next_poll_at = models.DateTimeField(default=timezone.now, db_index=True)
+    polled_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.endpoint} {self.params}"
@@ -0,0 +1,120 @@
+import json
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.db import connection
+
+from . import signals
+
+logger = logging.getLogger(__name__)
+
+_current_profile: ContextVar["CallbackProfile | None"] = ContextVar("esi_auth_callback_profile", default=None)
+
+
+def _count_query(execute, sql, params, many, context):
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.queries += 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counter(connection, **kwargs):
+    """
+    connection_created receiver, the context variable lets queries run through the async ORM's worker
+    thread count towards the callback that made them
+    """
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+class CallbackProfile:
+    """
+    Records wall time and query counts for each stage of one SSO callback.
+
+    Stages opened while another stage is running are recorded with a dotted name, e.g.
+    token_exchange.jwks, and are included in the parent's numbers.
+    """
+
+    def __init__(self):
+        self.stages: List[Dict[str, Any]] = []
+        self.outcome = "error"
+        self._stack: List[str] = []
+        self.queries = 0
+        self._started = None
+
+    @classmethod
+    def enabled(cls) -> bool:
+        return getattr(settings, "DJANGO_ESI_AUTH_PROFILE_CALLBACK", False)
+
+    @classmethod
+    @contextmanager
+    def start(cls):
+        """
+        Profile the enclosed callback if DJANGO_ESI_AUTH_PROFILE_CALLBACK is set, emitting the result on exit
+        """
+        if not cls.enabled():
+            yield None
+            return
+
+        profile = cls()
+        reset = _current_profile.set(profile)
+        profile._started = perf_counter()
+        # The current connection may have been opened before the receiver was connected
+        install_query_counter(connection)
+        try:
+            yield profile
+        finally:
+            _current_profile.reset(reset)
+            profile.emit(perf_counter() - profile._started)
+
+    @contextmanager
+    def stage(self, name: str):
+        self._stack.append(name)
+        full_name = ".".join(self._stack)
+        queries = self.queries
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append(
+                {
+                    "stage": full_name,
+                    "ms": round((perf_counter() - started) * 1000, 3),
+                    "queries": self.queries - queries,
+                }
+            )
+            self._stack.pop()
+
+    def as_dict(self, elapsed: float) -> Dict[str, Any]:
+        return {
+            "outcome": self.outcome,
+            "total_ms": round(elapsed * 1000, 3),
+            "total_queries": self.queries,
+            "stages": self.stages,
+        }
+
+    def emit(self, elapsed: float):
+        data = self.as_dict(elapsed)
+        logger.info(f"sso_callback_profile {json.dumps(data)}", extra={"sso_callback_profile": data})
+        signals.sso_callback_profiled.send(sender=self.__class__, profile=data)
+
+
+@contextmanager
+def profile_stage(name: str):
+    """
+    Time the enclosed block as a stage of the SSO callback being profiled, a no-op when profiling is off
+
+    Args:
+        name: Stage name
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+
+    with profile.stage(name):
+        yield
@@ -0,0 +1,288 @@
+import asyncio
+import logging
+import math
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from time import time
+from typing import Any, Dict, Iterable, List, Tuple
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import async_http
+from .batch import BatchExecutor, BatchJob
+from .choices import EveEntityTypeEnum
+from .client import ESIClient
+from .endpoints import get_endpoint
+from .exceptions import ESIRequestError, ESIResponseDecodeError
+from .models import EveEntity
+from .utils import esi_url
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = "esi_auth:public:{kind}:{entity_id}"
+
+# ESIClient method and route for each kind of public info
+KINDS = {
+    EveEntityTypeEnum.CHARACTER: ("get_public_character_data", "/characters/{character_id}/"),
+    EveEntityTypeEnum.CORPORATION: ("get_public_corporation_data", "/corporations/{corporation_id}/"),
+    EveEntityTypeEnum.ALLIANCE: ("get_public_alliance_data", "/alliances/{alliance_id}/"),
+}
+
+ENTITY_FIELDS = ["eve_entity_name", "eve_entity_type", "resolve_attempts", "resolve_after"]
+
+# Cached value: the public data and the POSIX time ESI said it expires
+Entry = Tuple[Dict[str, Any], float]
+
+
+def _kind(kind: str) -> EveEntityTypeEnum:
+    kind = EveEntityTypeEnum(kind)
+    if kind not in KINDS:
+        raise ValueError(f"No public info endpoint for {kind.value}")
+    return kind
+
+
+def _key(kind: EveEntityTypeEnum, entity_id: int) -> str:
+    return CACHE_KEY.format(kind=kind.value, entity_id=entity_id)
+
+
+def _url(kind: EveEntityTypeEnum, entity_id: int) -> str:
+    _, route = KINDS[kind]
+    return esi_url(get_endpoint("GET", route).build_path({f"{kind.value}_id": entity_id}))
+
+
+class PublicInfoCache:
+    """
+    Public character, corporation and alliance info, cached until ESI says it expires.
+
+    Lookups check a bounded in-process LRU first, then the Django cache, and only fetch IDs neither has,
+    concurrently.  Entries are kept until the Expires header of the response that fetched them (or
+    DJANGO_ESI_AUTH_PUBLIC_INFO_TIMEOUT seconds without one), so nothing is served staler than ESI itself
+    would serve it.  Fetched names are written to the matching EveEntity rows, so the login path, admin
+    and dashboards share one set of lookups.
+    """
+
+    def __init__(self, executor: BatchExecutor = None, update_entities: bool = True):
+        """
+        Args:
+            executor: Runs the fetches of get_many
+            update_entities: Write fetched names to matching EveEntity rows
+        """
+        self.executor = executor or BatchExecutor()
+        self.update_entities = update_entities
+        self._local: "OrderedDict[str, Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def max_local(self) -> int:
+        return getattr(settings, "DJANGO_ESI_AUTH_PUBLIC_INFO_LRU_SIZE", 1024)
+
+    @property
+    def fallback_timeout(self) -> int:
+        return getattr(settings, "DJANGO_ESI_AUTH_PUBLIC_INFO_TIMEOUT", 60 * 60)
+
+    def get(self, kind: str, entity_id: int) -> Dict[str, Any] | None:
+        """
+        Look up one ID, usually on a request path such as login, so a miss is fetched once without retries
+
+        Args:
+            kind: character, corporation or alliance
+            entity_id: ID to look up
+
+        Returns:
+            Public info, None if ESI didn't return it
+        """
+        return self.get_many(kind, [entity_id], retry=False).get(entity_id)
+
+    def get_many(self, kind: str, entity_ids: Iterable[int], retry: bool = True) -> Dict[int, Dict[str, Any]]:
+        """
+        Look up many IDs of one kind, fetching only the ones that aren't cached
+
+        Args:
+            kind: character, corporation or alliance
+            entity_ids: IDs to look up
+            retry: Wait and retry server errors and timeouts, otherwise each ID gets a single attempt
+
+        Returns:
+            Public info by ID, IDs ESI didn't return are left out
+        """
+        kind = _kind(kind)
+        results, missing = self._from_local(kind, entity_ids)
+        if missing:
+            cached = cache.get_many([_key(kind, entity_id) for entity_id in missing])
+            results.update(self._from_cache(kind, missing, cached))
+            missing = [entity_id for entity_id in missing if entity_id not in results]
+
+        if missing:
+            fetched = self._fetch(kind, missing) if retry else self._fetch_once(kind, missing)
+            for timeout, entries in self._remember(kind, fetched).items():
+                cache.set_many(entries, timeout=timeout)
+            if self.update_entities and fetched:
+                entities = self._entities(kind, fetched)
+                EveEntity.objects.bulk_update(self._entity_changes(kind, entities, fetched), ENTITY_FIELDS)
+            results.update({entity_id: data for entity_id, (data, _) in fetched.items()})
+
+        return results
+
+    async def aget(self, kind: str, entity_id: int) -> Dict[str, Any] | None:
+        return (await self.aget_many(kind, [entity_id])).get(entity_id)
+
+    async def aget_many(self, kind: str, entity_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Async version of get_many, fetches with async_http instead of worker threads
+        """
+        kind = _kind(kind)
+        results, missing = self._from_local(kind, entity_ids)
+        if missing:
+            cached = await cache.aget_many([_key(kind, entity_id) for entity_id in missing])
+            results.update(self._from_cache(kind, missing, cached))
+            missing = [entity_id for entity_id in missing if entity_id not in results]
+
+        if missing:
+            responses = await asyncio.gather(*(self._afetch(kind, i) for i in missing), return_exceptions=True)
+            fetched = {}
+            for entity_id, response in zip(missing, responses):
+                if isinstance(response, Exception):
+                    logger.info(f"Failed to fetch {kind.value} {entity_id}: {response}")
+                elif response is not None:
+                    fetched[entity_id] = response
+
+            for timeout, entries in self._remember(kind, fetched).items():
+                await cache.aset_many(entries, timeout=timeout)
+            if self.update_entities and fetched:
+                entities = [entity async for entity in self._entities(kind, fetched)]
+                await EveEntity.objects.abulk_update(self._entity_changes(kind, entities, fetched), ENTITY_FIELDS)
+            results.update({entity_id: data for entity_id, (data, _) in fetched.items()})
+
+        return results
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def _from_local(self, kind: EveEntityTypeEnum, entity_ids: Iterable[int]) -> Tuple[Dict[int, Any], List[int]]:
+        now = time()
+        found = {}
+        missing = []
+        with self._lock:
+            for entity_id in dict.fromkeys(entity_ids):
+                key = _key(kind, entity_id)
+                entry = self._local.get(key)
+                if entry is not None and entry[1] > now:
+                    self._local.move_to_end(key)
+                    found[entity_id] = entry[0]
+                else:
+                    missing.append(entity_id)
+        return found, missing
+
+    def _from_cache(self, kind: EveEntityTypeEnum, entity_ids: List[int], cached: Dict[str, Entry]) -> Dict[int, Any]:
+        found = {}
+        for entity_id in entity_ids:
+            entry = cached.get(_key(kind, entity_id))
+            if entry is not None:
+                found[entity_id] = entry[0]
+        self._remember_local(cached)
+        return found
+
+    def _remember_local(self, entries: Dict[str, Entry]):
+        if not entries:
+            return
+        with self._lock:
+            for key, entry in entries.items():
+                self._local[key] = entry
+                self._local.move_to_end(key)
+            while len(self._local) > self.max_local:
+                self._local.popitem(last=False)
+
+    def _remember(self, kind: EveEntityTypeEnum, fetched: Dict[int, Entry]) -> Dict[int, Dict[str, Entry]]:
+        """
+        Keep fetched entries locally and group them by Django cache timeout, they usually share one Expires
+
+        Returns:
+            Entries by timeout in seconds, entries that have already expired are left out
+        """
+        now = time()
+        by_timeout = defaultdict(dict)
+        for entity_id, entry in fetched.items():
+            if entry[1] > now:
+                by_timeout[math.ceil(entry[1] - now)][_key(kind, entity_id)] = entry
+        for entries in by_timeout.values():
+            self._remember_local(entries)
+        return by_timeout
+
+    def _expires_at(self, expires: datetime | None) -> float:
+        return expires.timestamp() if expires is not None else time() + self.fallback_timeout
+
+    def _fetch(self, kind: EveEntityTypeEnum, entity_ids: List[int]) -> Dict[int, Entry]:
+        method, _ = KINDS[kind]
+        jobs = [BatchJob(method, {f"{kind.value}_id": entity_id}, key=entity_id) for entity_id in entity_ids]
+        fetched = {}
+        for result in self.executor.run(jobs):
+            if result.ok:
+                fetched[result.job.key] = (result.data, self._expires_at(result.response.expires))
+            else:
+                logger.info(f"Failed to fetch {kind.value} {result.job.key}: {result.error}")
+        return fetched
+
+    def _fetch_once(self, kind: EveEntityTypeEnum, entity_ids: List[int]) -> Dict[int, Entry]:
+        method, _ = KINDS[kind]
+        client = ESIClient(keep_response=False, retry=False)
+        fetched = {}
+        for entity_id in entity_ids:
+            try:
+                response = getattr(client, method)(entity_id)
+            except (ESIRequestError, ESIResponseDecodeError, requests.RequestException) as e:
+                logger.info(f"Failed to fetch {kind.value} {entity_id}: {e}")
+                continue
+            if response.err:
+                logger.info(f"Failed to fetch {kind.value} {entity_id}: {response.err}")
+                continue
+            fetched[entity_id] = (response.data, self._expires_at(response.expires))
+        return fetched
+
+    async def _afetch(self, kind: EveEntityTypeEnum, entity_id: int) -> Entry | None:
+        return self._entry(kind, entity_id, await async_http.get(_url(kind, entity_id)))
+
+    def _entry(self, kind: EveEntityTypeEnum, entity_id: int, response) -> Entry | None:
+        """
+        Args:
+            response: requests or httpx response
+
+        Returns:
+            Cache entry, None for an error response
+        """
+        if response.status_code >= 400:
+            logger.info(f"Failed to fetch {kind.value} {entity_id}: {response.status_code} :: {response.text}")
+            return None
+
+        expires = response.headers.get("expires")
+        return response.json(), self._expires_at(parsedate_to_datetime(expires) if expires else None)
+
+    @staticmethod
+    def _entities(kind: EveEntityTypeEnum, fetched: Dict[int, Entry]):
+        # Rows leased by the resolution scheduler are left alone, it would write its own copy back over them
+        return EveEntity.objects.filter(
+            eve_entity_id__in=fetched.keys(), eve_entity_type__in=[kind, EveEntityTypeEnum.UNKNOWN]
+        ).exclude(leased_until__gt=timezone.now())
+
+    @staticmethod
+    def _entity_changes(
+        kind: EveEntityTypeEnum, entities: Iterable[EveEntity], fetched: Dict[int, Entry]
+    ) -> List[EveEntity]:
+        changed = []
+        for entity in entities:
+            name = fetched[entity.eve_entity_id][0].get("name")
+            if name and (entity.eve_entity_name != name or entity.eve_entity_type != kind):
+                entity.eve_entity_name = name
+                entity.eve_entity_type = kind
+                entity.resolve_attempts = 0
+                entity.resolve_after = None
+                changed.append(entity)
+        return changed
+
+
+public_info = PublicInfoCache()
@@ -0,0 +1,131 @@
+from dataclasses import dataclass, fields
+from datetime import datetime
+from functools import cache
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Type, TypeVar
+
+R = TypeVar("R", bound="Record")
+
+
+class Record:
+    """
+    Base for compact, slotted ESI rows.
+
+    Dates are kept as the ESI strings and only parsed when as_datetime() is called.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_dict(cls: Type[R], row: Dict[str, Any]) -> R:
+        return cls(*map(row.get, _field_names(cls)))
+
+    def as_datetime(self, field: str = "date") -> datetime | None:
+        value = getattr(self, field)
+        return datetime.fromisoformat(value) if value else None
+
+
+@cache
+def _field_names(record_type: Type[Record]) -> Tuple[str, ...]:
+    return tuple(f.name for f in fields(record_type))
+
+
+def decode_records(record_type: Type[R], rows: Iterable[Dict[str, Any]]) -> List[R]:
+    """
+    Convert ESI rows into typed records, unknown keys are dropped
+
+    Args:
+        record_type: Record class to build
+        rows: Decoded ESI rows
+
+    Returns:
+        List of records
+    """
+    names = _field_names(record_type)
+    return [record_type(*map(row.get, names)) for row in rows]
+
+
+def iter_records(record_type: Type[R], rows: Iterable[Dict[str, Any]]) -> Iterator[R]:
+    names = _field_names(record_type)
+    for row in rows:
+        yield record_type(*map(row.get, names))
+
+
+@dataclass(slots=True)
+class JournalEntry(Record):
+    id: int
+    date: str
+    ref_type: str
+    description: str
+    amount: float | None = None
+    balance: float | None = None
+    first_party_id: int | None = None
+    second_party_id: int | None = None
+    reason: str | None = None
+    context_id: int | None = None
+    context_id_type: str | None = None
+    tax: float | None = None
+    tax_receiver_id: int | None = None
+
+
+@dataclass(slots=True)
+class WalletTransaction(Record):
+    transaction_id: int
+    date: str
+    type_id: int
+    quantity: int
+    unit_price: float
+    client_id: int
+    location_id: int
+    is_buy: bool
+    is_personal: bool
+    journal_ref_id: int
+
+
+@dataclass(slots=True)
+class Contract(Record):
+    contract_id: int
+    issuer_id: int
+    issuer_corporation_id: int
+    assignee_id: int
+    acceptor_id: int
+    type: str
+    status: str
+    availability: str
+    for_corporation: bool
+    date_issued: str
+    date_expired: str
+    date_accepted: str | None = None
+    date_completed: str | None = None
+    days_to_complete: int | None = None
+    start_location_id: int | None = None
+    end_location_id: int | None = None
+    price: float | None = None
+    reward: float | None = None
+    collateral: float | None = None
+    buyout: float | None = None
+    volume: float | None = None
+    title: str | None = None
+
+
+@dataclass(slots=True)
+class ContractItem(Record):
+    record_id: int
+    type_id: int
+    quantity: int
+    is_included: bool
+    is_singleton: bool | None = None
+    raw_quantity: int | None = None
+    item_id: int | None = None
+
+
+# Record type for each ESIClient method that returns rows
+RECORD_TYPES: Dict[str, Type[Record]] = {
+    "get_character_journal": JournalEntry,
+    "get_character_transactions": WalletTransaction,
+    "get_corporation_journal": JournalEntry,
+    "get_corporation_transactions": WalletTransaction,
+    "get_character_contracts": Contract,
+    "get_corporation_contracts": Contract,
+    "get_character_contract_items": ContractItem,
+    "get_corporation_contract_items": ContractItem,
+}
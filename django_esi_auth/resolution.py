@@ -0,0 +1,165 @@
+import logging
+from datetime import timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .choices import EveEntityTypeEnum
+from .client import ESIClient
+from .models import EveEntity, Token
+from .structures import STRUCTURE_SCOPE, StructureResolver
+
+logger = logging.getLogger(__name__)
+
+# /universe/names/ accepts at most 1000 IDs per call
+NAMES_CHUNK_SIZE = 1000
+
+RESOLVE_FIELDS = ["eve_entity_name", "eve_entity_type", "resolve_attempts", "resolve_after", "leased_until"]
+
+
+class EntityResolutionScheduler:
+    """
+    Resolves Unknown entities from a shared queue so several workers can run at once.
+
+    Every run leases a chunk of due entities with SELECT ... FOR UPDATE SKIP LOCKED, marking them
+    leased_until a few minutes ahead before the locks are released, so concurrent workers pick
+    disjoint chunks and entities leased by a crashed worker become due again once the lease runs out.
+    Newly seen entities go first.  Entities ESI can't resolve are retried with exponential backoff
+    (DJANGO_ESI_AUTH_RESOLVE_BACKOFF seconds, doubling up to DJANGO_ESI_AUTH_RESOLVE_MAX_BACKOFF).
+    """
+
+    def __init__(
+        self,
+        tokens: Iterable[Token] = None,
+        client: ESIClient = None,
+        chunk_size: int = NAMES_CHUNK_SIZE,
+        lease_time: timedelta = timedelta(minutes=5),
+    ):
+        self.tokens = list(tokens) if tokens is not None else None
+        self.client = client or ESIClient(keep_response=False)
+        self.chunk_size = min(chunk_size, NAMES_CHUNK_SIZE)
+        self.lease_time = lease_time
+
+    @property
+    def backoff(self) -> int:
+        return getattr(settings, "DJANGO_ESI_AUTH_RESOLVE_BACKOFF", 300)
+
+    @property
+    def max_backoff(self) -> int:
+        return getattr(settings, "DJANGO_ESI_AUTH_RESOLVE_MAX_BACKOFF", 60 * 60 * 24)
+
+    def get_tokens(self) -> List[Token]:
+        if self.tokens is None:
+            self.tokens = list(Token.objects.usable().filter(scopes__contains=STRUCTURE_SCOPE))
+        return self.tokens
+
+    def lease(self, structures: bool = False) -> List[EveEntity]:
+        """
+        Take the next chunk of due entities off the queue
+
+        Args:
+            structures: Lease structures, which need tokens, instead of entities /universe/names/ can resolve
+
+        Returns:
+            Leased entities, nobody else will lease them until they are released or the lease runs out
+        """
+        now = timezone.now()
+        queue = EveEntity.objects.resolution_queue(now)
+        if structures:
+            queue = queue.filter(eve_entity_type=EveEntityTypeEnum.STRUCTURE)
+        else:
+            queue = queue.exclude(eve_entity_type=EveEntityTypeEnum.STRUCTURE)
+
+        with transaction.atomic():
+            entities = list(queue.select_for_update(skip_locked=True)[: self.chunk_size])
+            if entities:
+                leased_until = now + self.lease_time
+                EveEntity.objects.filter(pk__in=[entity.pk for entity in entities]).update(leased_until=leased_until)
+                for entity in entities:
+                    entity.leased_until = leased_until
+        return entities
+
+    def run_once(self) -> Tuple[int, int]:
+        """
+        Lease and resolve one chunk of entities and, if there are tokens to resolve them with, one chunk of structures
+
+        Returns:
+            Number of entities leased and number resolved
+        """
+        leased = resolved = 0
+
+        entities = self.lease()
+        if entities:
+            leased += len(entities)
+            resolved += self._release(entities, self._resolve_names(entities))
+
+        if self.get_tokens():
+            structures = self.lease(structures=True)
+            if structures:
+                leased += len(structures)
+                resolved += self._release(structures, self._resolve_structures(structures))
+
+        return leased, resolved
+
+    def run(self, max_chunks: int = None) -> int:
+        """
+        Work through the queue until nothing is due
+
+        Args:
+            max_chunks: Stop after this many runs, unlimited if not given
+
+        Returns:
+            Number of entities resolved
+        """
+        resolved = 0
+        chunks = 0
+        while max_chunks is None or chunks < max_chunks:
+            leased, count = self.run_once()
+            if not leased:
+                break
+            resolved += count
+            chunks += 1
+        return resolved
+
+    def _resolve_names(self, entities: List[EveEntity]) -> Dict[int, Dict[str, str]]:
+        ids = [entity.eve_entity_id for entity in entities]
+        response = self.client.get_names(ids)
+        if not response.err:
+            return {row["id"]: {"name": row["name"], "category": row["category"]} for row in response.data}
+
+        # ESI fails the whole call if any ID is invalid, split the chunk to isolate the bad ones
+        if response.status_code == 404 and len(entities) > 1:
+            middle = len(entities) // 2
+            return {**self._resolve_names(entities[:middle]), **self._resolve_names(entities[middle:])}
+
+        logger.info(f"Failed to resolve {len(ids)} names: {response.err}")
+        return {}
+
+    def _resolve_structures(self, entities: List[EveEntity]) -> Dict[int, Dict[str, str]]:
+        structures = StructureResolver(self.get_tokens()).resolve(entity.eve_entity_id for entity in entities)
+        return {
+            structure_id: {"name": data["name"], "category": EveEntityTypeEnum.STRUCTURE}
+            for structure_id, data in structures.items()
+        }
+
+    def _release(self, entities: List[EveEntity], results: Dict[int, Dict[str, str]]) -> int:
+        now = timezone.now()
+        for entity in entities:
+            result = results.get(entity.eve_entity_id)
+            if result is not None:
+                entity.eve_entity_name = result["name"]
+                entity.eve_entity_type = result["category"]
+                entity.resolve_attempts = 0
+                entity.resolve_after = None
+            else:
+                entity.resolve_attempts += 1
+                delay = min(self.backoff * 2 ** (entity.resolve_attempts - 1), self.max_backoff)
+                entity.resolve_after = now + timedelta(seconds=delay)
+            entity.leased_until = None
+
+        EveEntity.objects.bulk_update(entities, RESOLVE_FIELDS)
+        resolved = sum(1 for entity in entities if entity.eve_entity_id in results)
+        logger.debug(f"Resolved {resolved} of {len(entities)} leased entities")
+        return resolved
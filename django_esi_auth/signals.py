@@ -2,3 +2,21 @@ import django.dispatch
 
 
 token_created = django.dispatch.Signal()
+token_revoked = django.dispatch.Signal()
+
+# Instrumentation, see django_esi_auth.instrumentation
+esi_request_started = django.dispatch.Signal()
+esi_request_finished = django.dispatch.Signal()
+esi_pages_fetched = django.dispatch.Signal()
+token_refreshed = django.dispatch.Signal()
+
+# SSO callback profiling, see django_esi_auth.profiling
+sso_callback_profiled = django.dispatch.Signal()
+
+# Delta sync, see django_esi_auth.sync
+records_synced = django.dispatch.Signal()
+
+# Change feeds, see django_esi_auth.feeds
+records_added = django.dispatch.Signal()
+records_changed = django.dispatch.Signal()
+records_removed = django.dispatch.Signal()
@@ -0,0 +1,174 @@
+import logging
+from collections import Counter
+from typing import Any, Dict, Iterable, Set
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .batch import BatchExecutor, BatchJob
+from .models import EveUser, Token
+
+logger = logging.getLogger(__name__)
+
+STRUCTURE_SCOPE = "esi-universe.read_structures.v1"
+
+DATA_KEY = "esi_auth:structure:{structure_id}"
+DENIED_KEY = "esi_auth:structure_denied:{structure_id}"
+ACCESS_KEY = "esi_auth:structure_access:{structure_id}"
+OWNER_ACCESS_KEY = "esi_auth:structure_owner_access:{owner_id}"
+
+# How long we remember who could dock where, independent of the data timeout
+ACCESS_TIMEOUT = 60 * 60 * 24 * 30
+
+
+class StructureResolver:
+    """
+    Resolves structure names, systems and owners with as few 403s as possible.
+
+    Structure data is cached with a long TTL.  For every structure the resolver also remembers which
+    characters were denied and which character last succeeded, and for every owner which characters
+    can dock at its structures.  Lookups are routed to the most likely token first: the one that
+    succeeded before, then members of the owning corporation, then characters with access to other
+    structures of the same owner, then whoever succeeded most often this run.  Lookups for many
+    structures run concurrently, one token per structure per round.
+    """
+
+    def __init__(self, tokens: Iterable[Token], executor: BatchExecutor = None):
+        self.tokens = {
+            int(token.character_id): token
+            for token in tokens
+            if token.scopes and STRUCTURE_SCOPE in token.scopes and not token.is_quarantined
+        }
+        self.executor = executor or BatchExecutor()
+        self._corporations = None
+        self._successes = Counter()
+
+    @property
+    def data_timeout(self) -> int:
+        return getattr(settings, "DJANGO_ESI_AUTH_STRUCTURE_TIMEOUT", 60 * 60 * 24 * 7)
+
+    @property
+    def denied_timeout(self) -> int:
+        return getattr(settings, "DJANGO_ESI_AUTH_STRUCTURE_DENIED_TIMEOUT", 60 * 60 * 24)
+
+    @property
+    def corporations(self) -> Dict[int, int]:
+        """Corporation ID of each token's character, where known"""
+        if self._corporations is None:
+            self._corporations = dict(
+                EveUser.objects.filter(character_id__in=self.tokens.keys(), corporation_id__isnull=False).values_list(
+                    "character_id", "corporation_id"
+                )
+            )
+        return self._corporations
+
+    def get_cached(self, structure_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        return self._get_values(DATA_KEY, "structure_id", structure_ids)
+
+    def resolve(self, structure_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Get ESI structure data for each structure, from cache where possible
+
+        Args:
+            structure_ids: Structure IDs to resolve
+
+        Returns:
+            Structure data by ID, structures no token could access are left out
+        """
+        structure_ids = set(structure_ids)
+        results = self.get_cached(structure_ids)
+        pending = structure_ids - results.keys()
+        if not pending or not self.tokens:
+            return results
+
+        denied = self._get_sets(DENIED_KEY, "structure_id", pending)
+        access = self._get_values(ACCESS_KEY, "structure_id", pending)
+        owner_access = self._get_sets(OWNER_ACCESS_KEY, "owner_id", {a["owner_id"] for a in access.values()})
+
+        denied_changed = set()
+        while pending:
+            jobs = []
+            for structure_id in pending:
+                character_id = self._pick_character(denied[structure_id], access.get(structure_id), owner_access)
+                if character_id is not None:
+                    jobs.append(
+                        BatchJob(
+                            "get_structure",
+                            {"structure_id": structure_id},
+                            self.tokens[character_id],
+                            key=(structure_id, character_id),
+                        )
+                    )
+            if not jobs:
+                break
+
+            pending = set()
+            for result in self.executor.run(jobs):
+                structure_id, character_id = result.job.key
+                if result.ok:
+                    data = result.data
+                    results[structure_id] = data
+                    self._record_success(structure_id, character_id, data, owner_access)
+                elif result.response is not None and result.response.status_code == 403:
+                    denied[structure_id].add(character_id)
+                    denied_changed.add(structure_id)
+                    pending.add(structure_id)
+                else:
+                    logger.info(f"Failed to resolve structure {structure_id}: {result.error}")
+
+        if denied_changed:
+            cache.set_many(
+                {DENIED_KEY.format(structure_id=s): list(denied[s]) for s in denied_changed},
+                timeout=self.denied_timeout,
+            )
+
+        return results
+
+    @staticmethod
+    def _get_values(template: str, field: str, ids: Iterable[int]) -> Dict[int, Any]:
+        keys = {template.format(**{field: i}): i for i in ids}
+        return {keys[key]: value for key, value in cache.get_many(keys.keys()).items()}
+
+    @classmethod
+    def _get_sets(cls, template: str, field: str, ids: Iterable[int]) -> Dict[int, Set[int]]:
+        ids = list(ids)
+        cached = cls._get_values(template, field, ids)
+        return {i: set(cached.get(i, ())) for i in ids}
+
+    def _pick_character(
+        self, denied: Set[int], access: Dict[str, Any] | None, owner_access: Dict[int, Set[int]]
+    ) -> int | None:
+        candidates = [character_id for character_id in self.tokens if character_id not in denied]
+        if not candidates:
+            return None
+
+        owner_id = access["owner_id"] if access else None
+
+        def rank(character_id: int):
+            return (
+                access is not None and access["character_id"] == character_id,
+                owner_id is not None and self.corporations.get(character_id) == owner_id,
+                character_id in owner_access.get(owner_id, ()),
+                self._successes[character_id],
+            )
+
+        return max(candidates, key=rank)
+
+    def _record_success(
+        self, structure_id: int, character_id: int, data: Dict[str, Any], owner_access: Dict[int, Set[int]]
+    ):
+        owner_id = data.get("owner_id")
+        if owner_id not in owner_access:
+            owner_access[owner_id] = set(cache.get(OWNER_ACCESS_KEY.format(owner_id=owner_id), ()))
+        owners = owner_access[owner_id]
+        owners.add(character_id)
+        self._successes[character_id] += 1
+        cache.set(DATA_KEY.format(structure_id=structure_id), data, timeout=self.data_timeout)
+        cache.set_many(
+            {
+                ACCESS_KEY.format(structure_id=structure_id): {"character_id": character_id, "owner_id": owner_id},
+                OWNER_ACCESS_KEY.format(owner_id=owner_id): list(owners),
+            },
+            timeout=ACCESS_TIMEOUT,
+        )
+        cache.delete(DENIED_KEY.format(structure_id=structure_id))
@@ -0,0 +1,146 @@
+import logging
+from typing import Any, Dict, Iterator, List, NamedTuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import signals
+from .choices import EveEntityTypeEnum
+from .client import ESIClient, ESIResponse
+from .exceptions import ESIRequestError
+from .models import SyncCursor, Token
+from .records import RECORD_TYPES, decode_records
+
+logger = logging.getLogger(__name__)
+
+
+class SyncEndpoint(NamedTuple):
+    method: str
+    owner_type: str
+    id_field: str
+    # Not paginated, older rows are fetched by passing from_id
+    from_id: bool = False
+
+
+SYNC_ENDPOINTS: Dict[str, SyncEndpoint] = {
+    "character_journal": SyncEndpoint("get_character_journal", EveEntityTypeEnum.CHARACTER, "id"),
+    "character_transactions": SyncEndpoint(
+        "get_character_transactions", EveEntityTypeEnum.CHARACTER, "transaction_id", from_id=True
+    ),
+    "corporation_journal": SyncEndpoint("get_corporation_journal", EveEntityTypeEnum.CORPORATION, "id"),
+    "corporation_transactions": SyncEndpoint(
+        "get_corporation_transactions", EveEntityTypeEnum.CORPORATION, "transaction_id", from_id=True
+    ),
+}
+
+
+class DeltaSync:
+    """
+    Incremental sync of wallet journal and transaction rows.
+
+    ESI returns these newest first, so paging stops at the first page that contains an ID at or
+    below the stored cursor and an unchanged ETag on page one means there is nothing new at all.
+    Transactions aren't paginated, older batches are requested with from_id instead.
+    Only rows above the cursor are returned and sent with the records_synced signal.
+    """
+
+    def __init__(self, token: Token, client: ESIClient = None):
+        self.token = token
+        self.client = client or ESIClient(token, keep_response=False)
+
+    def sync(self, endpoint: str, owner_id: int, division: int = None, typed: bool = False) -> List[Any]:
+        """
+        Fetch the rows added since the last sync of this endpoint
+
+        Args:
+            endpoint: Key of SYNC_ENDPOINTS, e.g. character_journal
+            owner_id: Character or corporation ID
+            division: Wallet division for corporation endpoints
+            typed: Return records from django_esi_auth.records instead of dicts
+
+        Returns:
+            New rows, newest first
+        """
+        spec = SYNC_ENDPOINTS[endpoint]
+        cursor_key = endpoint if division is None else f"{endpoint}:{division}"
+        cursor, _ = SyncCursor.objects.get_or_create(owner_type=spec.owner_type, owner_id=owner_id, endpoint=cursor_key)
+
+        kwargs = {"etag": cursor.etag}
+        if division is not None:
+            kwargs["division"] = division
+        first_page = getattr(self.client, spec.method)(owner_id, **kwargs)
+
+        if first_page.status_code == 304:
+            SyncCursor.objects.filter(pk=cursor.pk).update(synced_at=timezone.now())
+            return []
+        if first_page.err:
+            raise ESIRequestError(f"Failed to sync {cursor_key} for {owner_id}: {first_page.err}")
+
+        id_field = spec.id_field
+        last_id = cursor.last_id
+        new_rows = []
+        if spec.from_id:
+            older = {key: value for key, value in kwargs.items() if key != "etag"}
+            pages = self._iter_from_id(spec, owner_id, first_page, older)
+        else:
+            pages = self.client.iter_pages(first_page)
+        for page in pages:
+            if page.err:
+                raise ESIRequestError(f"Failed to sync {cursor_key} for {owner_id}: {page.err}")
+            fresh = [row for row in page.data if row[id_field] > last_id]
+            new_rows.extend(fresh)
+            if len(fresh) < len(page.data):
+                # Reached rows we already have
+                break
+
+        cursor.etag = first_page.etag
+        cursor.synced_at = timezone.now()
+        if new_rows:
+            cursor.last_id = max(row[id_field] for row in new_rows)
+
+        if typed:
+            new_rows = decode_records(RECORD_TYPES[spec.method], new_rows)
+
+        # A receiver that raises rolls the cursor back, so the rows are delivered again on the next sync
+        with transaction.atomic():
+            cursor.save(update_fields=["etag", "synced_at", "last_id"])
+            if new_rows:
+                logger.debug(f"Synced {len(new_rows)} new {cursor_key} rows for {owner_id}")
+                signals.records_synced.send(
+                    sender=self.__class__,
+                    endpoint=endpoint,
+                    owner_type=spec.owner_type,
+                    owner_id=owner_id,
+                    division=division,
+                    rows=new_rows,
+                )
+
+        return new_rows
+
+    def _iter_from_id(
+        self, spec: SyncEndpoint, owner_id: int, first_page: ESIResponse, kwargs: Dict[str, Any]
+    ) -> Iterator[ESIResponse]:
+        """
+        Yield the first batch followed by older batches, each requested from below the oldest row so far,
+        until a batch comes back empty
+        """
+        page = first_page
+        yield page
+        while page.data:
+            oldest = min(row[spec.id_field] for row in page.data)
+            page = getattr(self.client, spec.method)(owner_id, from_id=oldest - 1, **kwargs)
+            if page.data and min(row[spec.id_field] for row in page.data) >= oldest:
+                raise ESIRequestError(f"{spec.method} ignored from_id {oldest - 1} for {owner_id}")
+            yield page
+
+    def character_journal(self, character_id: int, **kwargs) -> List[Any]:
+        return self.sync("character_journal", character_id, **kwargs)
+
+    def character_transactions(self, character_id: int, **kwargs) -> List[Any]:
+        return self.sync("character_transactions", character_id, **kwargs)
+
+    def corporation_journal(self, corporation_id: int, division: int = 1, **kwargs) -> List[Any]:
+        return self.sync("corporation_journal", corporation_id, division=division, **kwargs)
+
+    def corporation_transactions(self, corporation_id: int, division: int = 1, **kwargs) -> List[Any]:
+        return self.sync("corporation_transactions", corporation_id, division=division, **kwargs)
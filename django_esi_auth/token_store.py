@@ -0,0 +1,96 @@
+import base64
+import hashlib
+import json
+import logging
+from functools import cache as memoize
+from typing import Type
+
+from cryptography.fernet import Fernet, InvalidToken
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, router
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+TOKEN_KEY = "esi_auth:token:{pk}"
+INDEX_KEY = "esi_auth:token_index:{character_id}:{scope}"
+
+# Index entries only map to a primary key, they can safely outlive the token entry
+INDEX_TIMEOUT = 60 * 60 * 24
+
+
+def enabled() -> bool:
+    return getattr(settings, "DJANGO_ESI_AUTH_TOKEN_CACHE", False)
+
+
+@memoize
+def _fernet() -> Fernet:
+    digest = hashlib.sha256(f"django_esi_auth.token_store:{settings.SECRET_KEY}".encode()).digest()
+    return Fernet(base64.urlsafe_b64encode(digest))
+
+
+def _index_key(character_id, scope: str) -> str:
+    return INDEX_KEY.format(character_id=character_id, scope=hashlib.md5(scope.encode()).hexdigest())
+
+
+def put(token: models.Model):
+    """
+    Cache the token, encrypted, until its access token expires
+
+    Args:
+        token: Saved Token instance
+    """
+    timeout = int((token.expires_at - timezone.now()).total_seconds())
+    if token.pk is None or timeout <= 0:
+        return
+
+    values = {field.attname: getattr(token, field.attname) for field in token._meta.concrete_fields}
+    payload = _fernet().encrypt(json.dumps(values, cls=DjangoJSONEncoder).encode())
+    cache.set(TOKEN_KEY.format(pk=token.pk), payload, timeout=timeout)
+
+
+def get(model: Type[models.Model], pk) -> models.Model | None:
+    """
+    Args:
+        model: Token model
+        pk: Token primary key
+
+    Returns:
+        Token rebuilt from the cache, None if it isn't cached or can't be decrypted
+    """
+    payload = cache.get(TOKEN_KEY.format(pk=pk))
+    if payload is None:
+        return None
+
+    try:
+        values = json.loads(_fernet().decrypt(payload))
+    except InvalidToken:
+        # SECRET_KEY changed since the entry was written
+        return None
+
+    fields = model._meta.concrete_fields
+    try:
+        return model.from_db(
+            router.db_for_read(model), [f.attname for f in fields], [f.to_python(values[f.attname]) for f in fields]
+        )
+    except KeyError:
+        # Written before a field was added
+        return None
+
+
+def delete(pk):
+    cache.delete(TOKEN_KEY.format(pk=pk))
+
+
+def get_indexed(model: Type[models.Model], character_id, scope: str) -> models.Model | None:
+    pk = cache.get(_index_key(character_id, scope))
+    if pk is None:
+        return None
+    return get(model, pk)
+
+
+def put_indexed(token: models.Model, character_id, scope: str):
+    cache.set(_index_key(character_id, scope), token.pk, timeout=INDEX_TIMEOUT)
+    put(token)
@@ -1,8 +1,17 @@
+from django.conf import settings
 from django.urls import path
 
 from . import views
 
 app_name = "auth"
 urlpatterns = [
-    path("callback/", views.from_auth_redirect, name="callback"),
+    path(
+        "callback/",
+        (
+            views.afrom_auth_redirect
+            if getattr(settings, "DJANGO_ESI_AUTH_ASYNC_CALLBACK", False)
+            else views.from_auth_redirect
+        ),
+        name="callback",
+    ),
 ]
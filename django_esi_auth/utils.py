@@ -1,4 +1,7 @@
+import re
 import urllib
+from functools import lru_cache
+from typing import Iterable
 
 from django.conf import settings
 from django.core.signing import dumps
@@ -6,14 +9,78 @@ from django.http import HttpRequest
 from django.middleware.csrf import get_token
 from django.shortcuts import reverse
 
+SCOPE_SEPARATORS = re.compile(r"[\s,]+")
 
-def construct_eve_login_url(request: HttpRequest, scopes: str = None, next_url: str = None, save_user: bool = True):
+
+def esi_url(path: str = "") -> str:
+    """
+    Build a URL against the ESI host, DJANGO_ESI_AUTH_ESI_URL overrides the default host
+
+    Args:
+        path: Path to append, including the leading slash
+
+    Returns:
+        Full ESI URL
+    """
+    return f"{getattr(settings, 'DJANGO_ESI_AUTH_ESI_URL', 'https://esi.evetech.net')}{path}"
+
+
+def sso_url(path: str = "") -> str:
+    """
+    Build a URL against the Eve SSO host, DJANGO_ESI_AUTH_SSO_URL overrides the default host
+
+    Args:
+        path: Path to append, including the leading slash
+
+    Returns:
+        Full Eve SSO URL
+    """
+    return f"{getattr(settings, 'DJANGO_ESI_AUTH_SSO_URL', 'https://login.eveonline.com')}{path}"
+
+
+def normalize_scopes(scopes: str | Iterable[str] | None) -> str:
+    """
+    Normalize scopes given as a space or comma separated string, or an iterable of scopes
+
+    Args:
+        scopes: Scopes in any of the accepted forms
+
+    Returns:
+        De-duplicated, sorted and space separated scopes, empty if there are none
+    """
+    if not scopes:
+        return ""
+    if isinstance(scopes, str):
+        scopes = SCOPE_SEPARATORS.split(scopes)
+    return " ".join(sorted({scope.strip() for scope in scopes if scope and scope.strip()}))
+
+
+@lru_cache(maxsize=256)
+def _login_url_prefix(scheme: str, site_domain: str, client_id: str, authorize_url: str, scopes: str) -> str:
+    # Everything but the state, which is signed per request and appended last
+    query_params = {
+        "response_type": "code",
+        "client_id": client_id,
+        "redirect_uri": f"{scheme}://{site_domain}{reverse('auth:callback')}",
+    }
+
+    if scopes:
+        query_params["scope"] = scopes
+
+    return f"{authorize_url}?{urllib.parse.urlencode(query_params)}&state="
+
+
+def construct_eve_login_url(
+    request: HttpRequest, scopes: str | Iterable[str] = None, next_url: str = None, save_user: bool = True
+):
     """
     Construct an Eve SSO Login URL to start Auth flow
 
+    Only the signed state is built per call, the rest of the URL is memoized per scheme and scope set.
+
     Args:
         request: Current request
-        scopes: List of scopes to auth for
+        scopes: Scopes to auth for, space or comma separated, or a list
         next_url: Next URL to redirect to upon login
         save_user: Wether or not to save the user object or just a token
 
@@ -27,23 +94,12 @@ def construct_eve_login_url(request: HttpRequest, scopes: str = None, next_url:
         state["next"] = next_url
 
     signed_state = dumps(state, salt=settings.SECRET_KEY)
-    redirect_url = f"{request.scheme}://{settings.SITE_DOMAIN}{reverse('auth:callback')}"
-
-    if scopes:
-        if " " in scopes:
-            scopes = scopes.split(" ")
-        if "," in scopes:
-            scopes = scopes.split(",")
-
-    query_params = {
-        "response_type": "code",
-        "client_id": settings.ESI_SSO_CLIENT_ID,
-        "redirect_uri": redirect_url,
-        "state": signed_state,
-    }
-
-    if scopes:
-        query_params["scope"] = " ".join(scopes)
 
-    url_encoded_query = urllib.parse.urlencode(query_params)
-    return f"https://login.eveonline.com/v2/oauth/authorize?{url_encoded_query}"
+    prefix = _login_url_prefix(
+        request.scheme,
+        settings.SITE_DOMAIN,
+        settings.ESI_SSO_CLIENT_ID,
+        sso_url("/v2/oauth/authorize"),
+        normalize_scopes(scopes),
+    )
+    return f"{prefix}{urllib.parse.quote_plus(signed_state)}"
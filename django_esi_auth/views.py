@@ -1,5 +1,7 @@
 import re
+from typing import Any, Dict, Tuple
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import authenticate, login
@@ -10,9 +12,26 @@ from django.shortcuts import redirect, render
 
 from django_esi_auth.exceptions import EveCallbackStateInvalidError, EveTokenRequestError, EveTokenValidationError
 from .models import Token, TokenManager
+from .profiling import CallbackProfile, profile_stage
+
+try:
+    from django.contrib.auth import aauthenticate, alogin
+except ImportError:
+    # Django < 5.0
+    aauthenticate = sync_to_async(authenticate)
+    alogin = sync_to_async(login)
 
 
 def from_auth_redirect(request: HttpRequest):
+    with CallbackProfile.start() as profile:
+        return _from_auth_redirect(request, profile)
+
+
+def _validate_state(request: HttpRequest) -> Tuple[str, str, bool]:
+    """
+    Returns:
+        Authorization code, next URL and whether to log the user in
+    """
     signed_state = request.GET.get("state") or ""
     code = request.GET.get("code")
 
@@ -39,8 +58,10 @@ def from_auth_redirect(request: HttpRequest):
     if not all(checks):
         raise EveCallbackStateInvalidError("State failed validation checks")
 
-    token_response = TokenManager.request_access_token_from_auth_code(code)
+    return code, next_url, save_user
+
 
+def _validate_token_response(token_response: Dict[str, Any] | None):
     if token_response is None:
         raise EveTokenRequestError("Error getting token.")
 
@@ -53,21 +74,90 @@ def from_auth_redirect(request: HttpRequest):
     ):
         raise EveTokenValidationError("Invalid token audience.")
 
+
+def _from_auth_redirect(request: HttpRequest, profile: CallbackProfile | None):
+    with profile_stage("state"):
+        code, next_url, save_user = _validate_state(request)
+
+    with profile_stage("token_exchange"):
+        token_response = TokenManager.request_access_token_from_auth_code(code)
+
+    _validate_token_response(token_response)
+
     if save_user:
-        user = authenticate(request=request, token_response=token_response)
+        with profile_stage("authenticate"):
+            user = authenticate(request=request, token_response=token_response)
 
         if user:
-            login(request, user)
+            with profile_stage("login"):
+                login(request, user)
 
             if "scp" in token_response["claims"]:
                 if token_response["claims"]["scp"]:
-                    Token.objects.save_sso_response(token_response)
+                    with profile_stage("save_token"):
+                        Token.objects.save_sso_response(token_response)
 
+            if profile:
+                profile.outcome = "login"
             return redirect(next_url)
 
         messages.error(request, f"{token_response['identity']['character_name']} is not authorized to login.")
 
+        if profile:
+            profile.outcome = "denied"
         return render(request, "registration/login.html")
 
-    Token.objects.save_sso_response(token_response)
+    with profile_stage("save_token"):
+        Token.objects.save_sso_response(token_response)
+
+    if profile:
+        profile.outcome = "token"
+    return redirect(next_url)
+
+
+async def afrom_auth_redirect(request: HttpRequest):
+    """
+    Async SSO callback, the token exchange, JWKS and ESI lookups don't hold a thread while they wait
+    """
+    with CallbackProfile.start() as profile:
+        return await _afrom_auth_redirect(request, profile)
+
+
+async def _afrom_auth_redirect(request: HttpRequest, profile: CallbackProfile | None):
+    with profile_stage("state"):
+        code, next_url, save_user = _validate_state(request)
+
+    with profile_stage("token_exchange"):
+        token_response = await TokenManager.arequest_access_token_from_auth_code(code)
+
+    _validate_token_response(token_response)
+
+    if save_user:
+        with profile_stage("authenticate"):
+            user = await aauthenticate(request=request, token_response=token_response)
+
+        if user:
+            with profile_stage("login"):
+                await alogin(request, user)
+
+            if token_response["claims"].get("scp"):
+                with profile_stage("save_token"):
+                    await Token.objects.asave_sso_response(token_response)
+
+            if profile:
+                profile.outcome = "login"
+            return redirect(next_url)
+
+        messages.error(request, f"{token_response['identity']['character_name']} is not authorized to login.")
+
+        if profile:
+            profile.outcome = "denied"
+        # Templates reading request.user load the session from the database
+        return await sync_to_async(render)(request, "registration/login.html")
+
+    with profile_stage("save_token"):
+        await Token.objects.asave_sso_response(token_response)
+
+    if profile:
+        profile.outcome = "token"
     return redirect(next_url)